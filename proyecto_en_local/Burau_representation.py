@@ -2,6 +2,8 @@
 from sympy import *
 import numpy as np
 from braid import *
+from Laurent_polynomial import *
+from finite_field import *
 import time   # Para medir tiempos
 
 # MATRIZ DE BURAU ASOCIADA A UN GENERADOR POSITIVO 
@@ -79,8 +81,7 @@ def MatrizBurauSinAccion(palabra, grado, t_values):
 def MatrizBurauID(palabra, grado, t_values):
 
   Burau = eye(grado)          # Para poder iterar sobre el producto de matrices
-  ciclo_gen = Permutation(0)  # Almacenamos el ciclo del generador actual
-  perm_actual = Permutation(0)# Almacenamos la permutación a aplicar actual
+  perm_actual = Permutacion.Identidad(grado)# Permutación a aplicar actual
   t_values_perm = t_values    # Almacenamos t_values a aplicar actuales
 
   # Multiplicamos las sucesivas matrices de Burau simples de izquierda a derecha
@@ -94,8 +95,7 @@ def MatrizBurauID(palabra, grado, t_values):
       # Expandiendo cada x iteraciones conseguimos mejores tiempo de ejecuciones
       Burau = expand(Burau)
     Burau = Burau * MatrizBurauGen(i, grado, t_values_perm)
-    ciclo_gen = ProyectarSn([i], grado)
-    perm_actual = ciclo_gen * perm_actual
+    perm_actual = perm_actual.AplicarGenerador(i)
     t_values_perm = AplicarPermConj(perm_actual, t_values)
     end_time = time.time()
     execution_time_ID = end_time - start_time
@@ -106,7 +106,6 @@ def MatrizBurauID(palabra, grado, t_values):
 def MatrizBurauDI(palabra, grado, t_values):
 
   Burau = eye(grado)          # Para poder iterar sobre el producto de matrices
-  ciclo_gen = Permutation(0)  # Almacenamos el ciclo del generador actual
   perm_actual = ProyectarSn(palabra, grado)  # Almacenamos la perm a aplicar
   t_values_perm = []          # Almacenamos t_values a aplicar actuales
 
@@ -120,8 +119,7 @@ def MatrizBurauDI(palabra, grado, t_values):
     if (k%10 == 9 or k%10 == 4):
       # Expandiendo cada x iteraciones conseguimos mejores tiempo de ejecuciones
       Burau = expand(Burau)
-    ciclo_gen = ProyectarSn([i], grado)
-    perm_actual = ciclo_gen * perm_actual # Eliminamos primer ciclo de la perm
+    perm_actual = perm_actual.AplicarGenerador(i) # Eliminamos primer ciclo
     t_values_perm = AplicarPermConj(perm_actual, t_values)
     Burau = MatrizBurauGen(i, grado, t_values_perm) * Burau
     end_time = time.time()
@@ -130,6 +128,188 @@ def MatrizBurauDI(palabra, grado, t_values):
 
   return expand(Burau)
 
+# Coeficientes (columna, exponente de t, coeficiente entero) de la fila no
+# trivial de la matriz de Burau del generador (t = t_value que le corresponde)
+def FilaBurauLaurent(generador):
+
+  fila = abs(generador) - 1
+
+  if (generador > 0):
+    entradas = [(fila - 1, 1, 1), (fila, 1, -1), (fila + 1, 0, 1)]   # t, -t, 1
+  else:
+    entradas = [(fila - 1, 0, 1), (fila, -1, -1), (fila + 1, -1, 1)] # 1,-t^-1,t^-1
+
+  # El primer generador carece de la entrada a la izquierda de la diagonal
+  return entradas[1:] if fila == 0 else entradas
+
+# MATRIZ DE BURAU ASOCIADA A UN GENERADOR ARBITRARIO (POLINOMIOS DE LAURENT)
+  # Equivalente a 'MatrizBurauGen', donde t_indices[i] es el índice de la
+  # variable que ocupa la posición i de los t_values (ya permutados)
+def MatrizBurauGenLaurent(generador, grado, t_indices):
+
+  Burau = MatrizLaurent.Identidad(grado, grado)
+  fila = abs(generador) - 1
+  tv = t_indices[generador - 1] if generador > 0 else t_indices[-generador]
+
+  for columna, exponente, c in FilaBurauLaurent(generador):
+    Burau[fila, columna] = PolinomioLaurent.Variable(tv, grado, exponente, c)
+
+  return Burau
+
+# MATRIZ DE BURAU ASOCIADA A UNA TRENZA ARBITRARIA (POLINOMIOS DE LAURENT)
+  # Equivalente a 'MatrizBurauID' (mismo orden y acciones), con la variable
+  # t_{i+1} representada por el índice i. Como cada matriz de Burau simple es la
+  # identidad salvo en una fila, cada producto solo actualiza 2 o 3 columnas y
+  # los coeficientes de dicha fila son monomios
+def MatrizBurauLaurent(palabra, grado):
+
+  columnas = [[PolinomioLaurent.Constante(int(i == j), grado)
+               for i in range(grado)] for j in range(grado)]
+  perm = list(range(grado))   # Permutación a aplicar a los t_values
+
+  for gen in palabra:
+    fila = abs(gen) - 1
+    tv = perm[gen - 1] if gen > 0 else perm[-gen]
+    columna_fila = columnas[fila]
+
+    for columna, exponente, c in FilaBurauLaurent(gen):
+      producto = [p.MultiplicarMonomio(c, tv, exponente) for p in columna_fila]
+      if (columna == fila):
+        columnas[columna] = producto
+      else:
+        for a, b in zip(columnas[columna], producto):
+          a += b    # Las entradas de cada columna no se comparten
+
+    perm[fila], perm[fila + 1] = perm[fila + 1], perm[fila]
+
+  return MatrizLaurent([[columnas[j][i] for j in range(grado)]
+                        for i in range(grado)])
+
+# Potencia modular elemento a elemento (exponentes posiblemente negativos) de un
+# array de bases, por exponenciación binaria (modulo < 2^31 para no desbordar)
+def PotenciaModular(base, exponente, modulo):
+
+  base = np.asarray(base, dtype=np.int64) % modulo
+  if (exponente < 0):
+    base = PotenciaModular(base, modulo - 2, modulo)   # Inverso (módulo primo)
+    exponente = -exponente
+
+  resultado = np.ones_like(base)
+  while exponente:
+    if (exponente & 1):
+      resultado = resultado * base % modulo
+    base = base * base % modulo
+    exponente >>= 1
+
+  return resultado
+
+# Matriz de Burau simbólica compilada para su evaluación vectorizada en muchos
+# puntos. Todos los términos de todas las entradas se almacenan como un array de
+# exponentes (T, n), otro de coeficientes (T,) y el índice de la entrada a la
+# que pertenece cada término, de modo que evaluar K asignaciones de t_values es
+# una única pasada sobre arrays (K, T)
+class EvaluadorBurau:
+
+  # Constructor (a partir de una MatrizLaurent o de una Matrix de SymPy en las
+  # variables t_values)
+  def __init__(self, matriz, t_values = None):
+
+    if isinstance(matriz, MatrizLaurent):
+      self.shape = matriz.shape
+      self.nvars = matriz[0, 0].nvars
+      entradas = [{p.Exponentes(clave): c for clave, c in p.terminos.items()}
+                  for fila in matriz.filas for p in fila]
+    else:
+      self.shape = matriz.shape
+      self.nvars = len(t_values)
+      entradas = [self.TerminosSympy(expand(expr), t_values) for expr in matriz]
+
+    exponentes, coeficientes, indices = [], [], []
+    for indice, terminos in enumerate(entradas):
+      for e, c in terminos.items():
+        exponentes.append(e)
+        coeficientes.append(c)
+        indices.append(indice)
+
+    self.exponentes = np.array(exponentes, dtype=np.int64).reshape(-1, self.nvars)
+    self.coeficientes = np.array(coeficientes, dtype=np.int64)
+    self.indices = np.array(indices, dtype=np.int64)
+
+  # Términos {exponentes: coeficiente} de un polinomio de Laurent de SymPy
+  @staticmethod
+  def TerminosSympy(expr, t_values):
+
+    terminos = {}
+    for monomio, c in expr.as_coefficients_dict().items():
+      potencias = monomio.as_powers_dict()
+      e = tuple(int(potencias.get(t, 0)) for t in t_values)
+      terminos[e] = terminos.get(e, 0) + int(c)
+
+    return terminos
+
+  # Evalúa la matriz en las K asignaciones de t_values de 'puntos' (K, n) y
+  # devuelve las K matrices evaluadas. Opcionalmente se reduce módulo un primo
+  # 'modulo' (< 2^31) o en el campo finito CF(2^gradoCF); si no, en coma flotante
+  def Evaluar(self, puntos, modulo = None, gradoCF = None):
+
+    puntos = np.atleast_2d(np.asarray(puntos, dtype=np.int64
+                                      if (modulo or gradoCF) else np.float64))
+    K = len(puntos)
+    entradas = self.shape[0] * self.shape[1]
+
+    if (gradoCF is not None):
+      valores = self.EvaluarTerminosCF(puntos, gradoCF)
+      resultado = np.zeros((entradas, K), dtype=valores.dtype)
+      np.bitwise_xor.at(resultado, self.indices, valores.T)
+
+    elif (modulo is not None):
+      valores = np.ones((K, len(self.coeficientes)), dtype=np.int64)
+      for j in range(self.nvars):
+        for e in np.unique(self.exponentes[:, j]):
+          if (e != 0):
+            terminos = self.exponentes[:, j] == e
+            valores[:, terminos] = valores[:, terminos] * \
+              PotenciaModular(puntos[:, j], int(e), modulo)[:, None] % modulo
+      valores = valores * (self.coeficientes % modulo) % modulo
+      resultado = np.zeros((entradas, K), dtype=np.int64)
+      np.add.at(resultado, self.indices, valores.T)
+      resultado %= modulo
+
+    else:
+      valores = self.coeficientes * np.prod(
+        puntos[:, None, :] ** self.exponentes[None, :, :], axis=2)
+      resultado = np.zeros((entradas, K))
+      np.add.at(resultado, self.indices, valores.T)
+
+    return resultado.T.reshape(K, *self.shape)
+
+  # Valores en CF(2^gradoCF) de todos los términos: en característica 2 solo
+  # cuenta la paridad del coeficiente y las potencias se obtienen sumando
+  # logaritmos módulo 2^gradoCF - 1
+  def EvaluarTerminosCF(self, puntos, gradoCF):
+
+    CF = ObtenerCampoFinito(gradoCF)
+    puntos = puntos.astype(CF.dtype)
+    ceros = (puntos == 0).astype(np.int64)
+    if np.any(ceros @ (self.exponentes < 0).T):
+      raise ZeroDivisionError("El 0 no es invertible en el campo finito")
+
+    logaritmos = CF.log[puntos].astype(np.int64)
+    exponente = (logaritmos @ self.exponentes.T) % (CF.orden - 1)
+    nulos = (ceros @ (self.exponentes != 0).T) > 0
+    valores = CF.exp[exponente]
+
+    return np.where(nulos | (self.coeficientes % 2 == 0), 0, valores
+                    ).astype(CF.dtype)
+
+  __call__ = Evaluar
+
+# Compila una matriz de Burau simbólica (MatrizLaurent o Matrix de SymPy) para
+# evaluarla de forma vectorizada en muchas asignaciones de t_values
+def CompilarBurau(matriz, t_values = None):
+
+  return EvaluadorBurau(matriz, t_values)
+
 if __name__ == "__main__":
 
   # Definimos los n t_values del grupo Bn
@@ -244,3 +424,29 @@ if __name__ == "__main__":
   execution_time_DI = end_time - start_time
   print("\nTiempo TOTAL Versión DI:", execution_time_DI, "segundos\n")
   del BurauDI
+
+  print("PRUEBAS DE EFICIENCIA CON POLINOMIOS DE LAURENT NATIVOS:\n")
+
+  start_time = time.time()
+  BurauLaurent = MatrizBurauLaurent(elementos_final, 8)
+  end_time = time.time()
+  print("Tiempo TOTAL Versión Laurent (misma palabra):", end_time - start_time,
+        "segundos")
+
+  start_time = time.time()
+  BurauLaurent = MatrizBurauLaurent(elementos_final * 2, 8)
+  end_time = time.time()
+  print("Tiempo TOTAL Versión Laurent (palabra 2 veces más larga):",
+        end_time - start_time, "segundos\n")
+
+  print("EVALUACIÓN VECTORIZADA EN MUCHOS PUNTOS:\n")
+
+  # Compilamos la matriz de la trenza b y la evaluamos en 1000 asignaciones
+  evaluador = CompilarBurau(MatrizBurauLaurent(b.elementos, b.grado))
+  puntos = np.random.randint(1, 32, size = (1000, b.grado))
+  start_time = time.time()
+  evaluaciones = evaluador(puntos, gradoCF = 5)
+  end_time = time.time()
+  print("1000 evaluaciones en CF(2^5) en", end_time - start_time, "segundos")
+  print("Primera asignación:", puntos[0])
+  print("Matriz evaluada:\n", evaluaciones[0], "\n")
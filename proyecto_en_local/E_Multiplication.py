@@ -1,6 +1,8 @@
 
 from Burau_representation import *
-from pyfinite import ffield
+from finite_field import *
+from concurrent.futures import ProcessPoolExecutor
+import random
 
 
 # Función evaluadora E-Multiplicación
@@ -32,49 +34,255 @@ def Eval_CB_EMult(generador, gradoBn, gradoCF, permutacion, t_values, eval):
 
   return CB
 
+# Calcula el t_value (ya evaluado) que interviene en la matriz de Burau
+# coloreada del generador, una vez aplicada la permutación a los t_values
+  # (la permutación puede darse también directamente como su array_form)
+def TValueGenerador(generador, permutacion, eval):
+
+  array_form = getattr(permutacion, "array_form", permutacion)
+
+  if (generador > 0):
+    return int(eval[array_form[generador - 1]])
+  else:
+    return int(eval[array_form[-generador]])
+
+# Fila no trivial de la matriz de Burau coloreada del generador evaluada en
+# CF(2^gradoCF) para el t_value tv (el resto de la matriz es la identidad).
+# Devuelve las columnas no nulas de dicha fila junto con sus valores en el campo,
+# ya corregidos los signos (Z2) y las inversiones de los generadores negativos
+@lru_cache(maxsize=None)
+def FilaBurauCF(generador, gradoCF, tv):
+
+  fila = abs(generador) - 1
+
+  if (generador > 0):
+    valores = (tv, tv, 1)     # t, -t, 1
+  else:
+    inverso = int(ObtenerCampoFinito(gradoCF).Inverse(tv))
+    valores = (1, inverso, inverso)   # 1, -t^-1, t^-1
+
+  # El primer generador carece de la entrada a la izquierda de la diagonal
+  if (fila == 0):
+    return (0, 1), valores[1:]
+  else:
+    return (fila - 1, fila, fila + 1), valores
+
+# Matriz de Burau coloreada del generador evaluada en CF(2^gradoCF) para el
+# t_value tv. Se cachea por (generador, gradoBn, gradoCF, tv) y se devuelve como
+# array de solo lectura compartido
+@lru_cache(maxsize=None)
+def MatrizBurauCF(generador, gradoBn, gradoCF, tv):
+
+  CB = np.eye(gradoBn, dtype=ObtenerCampoFinito(gradoCF).dtype)
+  columnas, valores = FilaBurauCF(generador, gradoCF, tv)
+  CB[abs(generador) - 1, list(columnas)] = valores
+  CB.flags.writeable = False
+
+  return CB
+
+# Versión de 'Eval_CB_EMult' sin cálculo simbólico: obtiene la matriz evaluada
+# directamente de la caché a partir del t_value que le corresponde al generador
+def Eval_CB_EMult_CF(generador, gradoBn, gradoCF, permutacion, eval):
+
+  tv = TValueGenerador(generador, permutacion, eval)
+
+  return MatrizBurauCF(generador, gradoBn, gradoCF, tv)
+
+# Multiplica (in situ) M por la derecha por la matriz de Burau coloreada evaluada
+# del generador. Al ser esta la identidad salvo en una fila con a lo sumo 3
+# entradas no nulas, solo cambian 2 o 3 columnas de M: M' = M + M[:,fila] *
+# (CB[fila,:] - e_fila), es decir, una actualización O(gradoBn)
+def AplicarGeneradorCF(M, generador, tv, gradoCF):
+
+  CF = ObtenerCampoFinito(gradoCF)
+  columnas, valores = FilaBurauCF(generador, gradoCF, tv)
+  fila = abs(generador) - 1
+  columna_fila = M[:, fila].copy()    # Columna original (se sobreescribe)
+
+  for columna, valor in zip(columnas, valores):
+    if (columna == fila):
+      M[:, columna] = CF.Multiply(columna_fila, valor)
+    else:
+      M[:, columna] ^= CF.Multiply(columna_fila, valor)
+
+  return M
+
 # Función multiplicadora de matrices sobre el campo CF(2^n)
 def Mult_Matrix_CF(matriz1, matriz2, gradoCF):
 
-  # Creamos el campo finito de grado 2^gradoCF
-  CF = ffield.FField(gradoCF)
+  # Campo finito de grado 2^gradoCF (con sus tablas, compartido entre llamadas)
+  CF = ObtenerCampoFinito(gradoCF)
 
-  # Matriz donde devolveremos el resultado
-  filas_res = matriz1.rows        # Coinciden las filas de matriz1 y resultado
-  columnas_res = matriz2.cols     # Igual para las columnas de matriz2
-  resultado = Matrix.zeros(filas_res, columnas_res)
+  # Producto de matrices completo en una única operación vectorizada
+  resultado = CF.MultiplyMatrix(CF.Convertir(matriz1), CF.Convertir(matriz2))
 
-  for i in range(filas_res):
-    for j in range(columnas_res):
-      for k in range(matriz1.cols):
-        resultado[i,j] = CF.Add(resultado[i,j],
-          int(CF.Multiply(int(matriz1[int(i),int(k)]),
-                          int(matriz2[int(k),int(j)]))))
-
-  return resultado
+  return Matrix(resultado)
 
 # Función para E-Multiplicar (M, permutacionM)*(palabra, permutacionPalabra)
+  # (los t_values simbólicos se mantienen por compatibilidad, la evaluación
+  # solo depende de la posición de cada valor en 'eval')
+  # En modo "disperso" cada generador se aplica como una actualización de las
+  # columnas afectadas de M; en modo "denso" como un producto de matrices
 def E_Multiplicacion(M, permutacionM, palabra,
-                    gradoBn, gradoCF, t_values, eval):
+                    gradoBn, gradoCF, t_values, eval, modo = "disperso"):
+
+  CF = ObtenerCampoFinito(gradoCF)
+  M = CF.Convertir(M)   # Copia mutable sobre la que acumular
+
+  # Permutación/acción como lista de enteros, actualizada in situ
+  perm = [int(x) for x in permutacionM.array_form]
+  perm += range(len(perm), gradoBn)
 
   # Una E-Multiplicación (acumulada) para cada generador de la palabra
   for gen in palabra:
 
-    # Calculamos la evaluación de la r->CB(gen)
-    Eval_aux = Eval_CB_EMult(gen, gradoBn,gradoCF, permutacionM, t_values, eval)
+    if (modo == "disperso"):
+      # Actualizamos solo las columnas que modifica r->CB(gen)
+      tv = TValueGenerador(gen, perm, eval)
+      AplicarGeneradorCF(M, gen, tv, gradoCF)
 
-    # Multiplicamos las matrices (acumulativamente) en CF(2^gradoCF)
-    M = Mult_Matrix_CF(Matrix(M), Matrix(Eval_aux), gradoCF)
+    else:
+      # Obtenemos la evaluación de r->CB(gen) de la caché
+      Eval_aux = Eval_CB_EMult_CF(gen, gradoBn, gradoCF, perm, eval)
 
-    # Actualizamos permutación/acción
-    permutacionM = ProyectarSn([gen], gradoBn) * permutacionM
+      # Multiplicamos las matrices (acumulativamente) en CF(2^gradoCF)
+      M = CF.MultiplyMatrix(M, Eval_aux)
 
-  return (M, permutacionM)
+    # Actualizamos permutación/acción (ProyectarSn([gen]) * permutacionM)
+    i = abs(gen)
+    perm[i-1], perm[i] = perm[i], perm[i-1]
 
-# E-Multiplicación trivial
-def E_Multiplicacion_P(palabra, gradoBn, gradoCF, t_values, eval):
+  return (Matrix(M), Permutacion(perm))
 
-  return E_Multiplicacion(np.eye(gradoBn), Permutation(range(gradoBn)), palabra,
-                          gradoBn, gradoCF, t_values, eval)
+# E-Multiplicación trivial
+def E_Multiplicacion_P(palabra, gradoBn, gradoCF, t_values, eval,
+                       modo = "disperso"):
+
+  return E_Multiplicacion(np.eye(gradoBn), Permutacion.Identidad(gradoBn), palabra,
+                          gradoBn, gradoCF, t_values, eval, modo)
+
+# E-Multiplicación por lotes: E-Multiplica a la vez K pares (M, permutacionM)
+# (como tensor (K, gradoBn, gradoBn) y array (K, gradoBn) de array_forms) por
+# K palabras. El bucle recorre las posiciones de las palabras, aplicando en cada
+# paso la actualización dispersa de columnas a todas las matrices del lote
+# simultáneamente (las palabras más cortas se completan con el generador 0,
+# que no tiene efecto)
+def E_Multiplicacion_Lote(Ms, permutaciones, palabras, gradoBn, gradoCF, eval):
+
+  CF = ObtenerCampoFinito(gradoCF)
+  Ms = np.array(Ms).astype(np.int64).astype(CF.dtype)
+  P = np.array([p.array_form if hasattr(p, "array_form") else p
+                for p in permutaciones], dtype=np.int64)
+  eval = np.asarray(eval, dtype=np.int64)
+
+  # Palabras alineadas por posición en una matriz (K, longitud máxima)
+  longitud = max((len(palabra) for palabra in palabras), default=0)
+  W = np.zeros((len(palabras), longitud), dtype=np.int64)
+  for k, palabra in enumerate(palabras):
+    W[k, :len(palabra)] = palabra
+
+  for paso in range(longitud):
+
+    # Matrices del lote que todavía tienen generadores por aplicar
+    k = np.nonzero(W[:, paso])[0]
+    if (len(k) == 0):
+      continue
+    gen = W[k, paso]
+    fila = np.abs(gen) - 1
+    positivo = gen > 0
+
+    # t_values evaluados tras aplicar la permutación de cada matriz
+    tv = eval[P[k, np.where(positivo, fila, fila + 1)]].astype(CF.dtype)
+    inverso = CF.Inverse(np.where(positivo, 1, tv))
+
+    # Valores de la fila no trivial (izquierda, diagonal, derecha) de cada CB
+    uno = np.ones_like(tv)
+    izquierda = np.where(positivo, tv, uno)
+    diagonal = np.where(positivo, tv, inverso)
+    derecha = np.where(positivo, uno, inverso)
+
+    # Actualización de las columnas afectadas de cada matriz
+    columna_fila = Ms[k, :, fila]
+    Ms[k, :, fila] = CF.Multiply(columna_fila, diagonal[:, None])
+    Ms[k, :, fila + 1] ^= CF.Multiply(columna_fila, derecha[:, None])
+    con_izquierda = fila > 0
+    ki, fi = k[con_izquierda], fila[con_izquierda]
+    Ms[ki, :, fi - 1] ^= CF.Multiply(columna_fila[con_izquierda],
+                                     izquierda[con_izquierda][:, None])
+
+    # Actualizamos permutaciones/acciones (trasposición de fila y fila + 1)
+    P[k, fila], P[k, fila + 1] = P[k, fila + 1], P[k, fila]
+
+  return Ms, P
+
+# E-Multiplicación trivial por lotes
+def E_Multiplicacion_P_Lote(palabras, gradoBn, gradoCF, eval):
+
+  K = len(palabras)
+  Ms = np.broadcast_to(np.eye(gradoBn, dtype=np.int64), (K, gradoBn, gradoBn))
+  permutaciones = np.tile(np.arange(gradoBn), (K, 1))
+
+  return E_Multiplicacion_Lote(Ms, permutaciones, palabras, gradoBn, gradoCF,
+                               eval)
+
+# E-Multiplicación de un tramo de palabra partiendo de la identidad con la
+# permutación inicial dada. Es la unidad de trabajo independiente de
+# 'E_Multiplicacion_Arbol' (función de módulo para poder enviarla a procesos)
+def E_Multiplicacion_Tramo(tramo):
+
+  palabra, permutacion, gradoBn, gradoCF, eval = tramo
+  M = E_Multiplicacion(np.eye(gradoBn), permutacion, palabra, gradoBn, gradoCF,
+                       None, eval)[0]
+
+  return ObtenerCampoFinito(gradoCF).Convertir(M)
+
+# E-Multiplicación divide y vencerás. Los pares (M, permutación) forman un
+# monoide (producto semidirecto), de modo que para w = uv se tiene
+# (M, p)*w = (M * A_u * A_v, p_uv), donde A_u y A_v se calculan partiendo de la
+# identidad con las permutaciones p y p_u respectivamente. Como proyectar sobre
+# Sn es barato, se calculan primero las permutaciones iniciales de cada tramo de
+# 'tamano_tramo' generadores, después sus matrices de forma independiente y
+# finalmente se combinan en un árbol de productos equilibrado.
+  # Por defecto los tramos se evalúan juntos con 'E_Multiplicacion_Lote'; si se
+  # pasa 'mapeador' (por ejemplo el 'map' de un ProcessPoolExecutor) se le
+  # entrega 'E_Multiplicacion_Tramo' junto con la lista de tramos
+def E_Multiplicacion_Arbol(M, permutacionM, palabra, gradoBn, gradoCF,
+                           t_values, eval, tamano_tramo = 64, mapeador = None):
+
+  CF = ObtenerCampoFinito(gradoCF)
+
+  # Permutaciones iniciales de cada tramo
+  perm = [int(x) for x in permutacionM.array_form]
+  perm += range(len(perm), gradoBn)
+  tramos = []
+  for inicio in range(0, len(palabra), tamano_tramo):
+    tramo = list(palabra[inicio:inicio + tamano_tramo])
+    tramos.append((tramo, Permutacion(perm), gradoBn, gradoCF, eval))
+    for gen in tramo:
+      i = abs(gen)
+      perm[i-1], perm[i] = perm[i], perm[i-1]
+
+  # Matrices de los tramos (hojas del árbol)
+  if (mapeador is None):
+    hojas = E_Multiplicacion_Lote(
+      np.broadcast_to(np.eye(gradoBn, dtype=CF.dtype),
+                      (len(tramos), gradoBn, gradoBn)),
+      [tramo[1] for tramo in tramos], [tramo[0] for tramo in tramos],
+      gradoBn, gradoCF, eval)[0]
+  else:
+    hojas = list(mapeador(E_Multiplicacion_Tramo, tramos))
+
+  # Árbol de productos: en cada nivel se multiplican a la vez los pares
+  # consecutivos, conservando el orden
+  nivel = np.concatenate((CF.Convertir(M)[None],
+                          np.array(hojas, dtype=CF.dtype).reshape(
+                            -1, gradoBn, gradoBn)))
+  while (len(nivel) > 1):
+    pares = len(nivel) // 2
+    productos = CF.MultiplyMatrix(nivel[0:2*pares:2], nivel[1:2*pares:2])
+    nivel = np.concatenate((productos, nivel[2*pares:]))
+
+  return (Matrix(nivel[0]), Permutacion(perm))
 
 if __name__ == "__main__":
 
@@ -96,6 +304,8 @@ if __name__ == "__main__":
                             eval)
   print(f"\nCB evaluada del generador {generador} tras aplicar la corrección de \
   inversión:\n", np.array(CB_prueba))
+  print(f"\nCB evaluada del generador {generador} obtenida de la caché (sin \
+  SymPy):\n", Eval_CB_EMult_CF(generador, gradoBn, gradoCF, permutacion, eval))
 
 
 
@@ -164,3 +374,29 @@ if __name__ == "__main__":
   print("Matriz resultado:\n")
   pprint(E_mult_P[0])
   print("\nPermutación resultado:", E_mult_P[1], "\n")
+
+  print("\nEJEMPLO DE EJECUCIÓN DE LA E-MULTIPLICACION TRIVIAL POR LOTES:\n")
+
+  palabras = [trenza.elementos, [1, 2, -3, 1], [3, -1]]
+  Ms_lote, P_lote = E_Multiplicacion_P_Lote(palabras, gradoBn, gradoCF, eval)
+  for k in range(len(palabras)):
+    print("Palabra:", palabras[k])
+    print("Matriz resultado:\n", Ms_lote[k])
+    print("Permutación resultado:", Permutacion(P_lote[k]), "\n")
+
+  print("EJEMPLO DE EJECUCIÓN DE LA E-MULTIPLICACION EN ÁRBOL:\n")
+
+  palabra_larga = [random.choice([-3, -2, -1, 1, 2, 3]) for _ in range(1000)]
+  E_mult_secuencial = E_Multiplicacion(M, permutacionM, palabra_larga, gradoBn,
+                                       gradoCF, t_values, eval)
+  E_mult_arbol = E_Multiplicacion_Arbol(M, permutacionM, palabra_larga, gradoBn,
+                                        gradoCF, t_values, eval)
+  with ProcessPoolExecutor(2) as ejecutor:
+    E_mult_procesos = E_Multiplicacion_Arbol(M, permutacionM, palabra_larga,
+                                             gradoBn, gradoCF, t_values, eval,
+                                             mapeador = ejecutor.map)
+  print("Longitud de la palabra:", len(palabra_larga))
+  print("¿Coincide el árbol con la E-Multiplicación secuencial?",
+        E_mult_arbol == E_mult_secuencial)
+  print("¿Y repartiendo los tramos entre procesos?",
+        E_mult_procesos == E_mult_secuencial, "\n")
@@ -4,8 +4,470 @@
 # para integrar algoritmos matemáticos de alta velocidad en Python, y no descartamos 
 # su inclusión en el trabajo más adelante.
 from sympy import *
+from fractions import Fraction
+from finite_field import *
 import numpy as np
 
+
+# Polinomio de Laurent multivariable con coeficientes enteros, representado de
+# forma dispersa como diccionario {exponentes: coeficiente}. Los términos nulos
+# nunca se almacenan, por lo que la representación está siempre normalizada (no
+# hace falta expandir). Cada tupla de exponentes se empaqueta en un único
+# entero (BITS bits por variable, desplazados en DESPLAZAMIENTO), de modo que
+# multiplicar por un monomio se reduce a sumar una constante a cada clave. Un
+# exponente fuera de [-2^15, 2^15 - 1] invadiría el campo de la variable
+# siguiente, así que las operaciones que crean exponentes lanzan OverflowError
+class PolinomioLaurent:
+
+  __slots__ = ("nvars", "terminos")
+
+  BITS = 16
+  DESPLAZAMIENTO = 2**15
+  EXPONENTE_MINIMO = -2**15
+  EXPONENTE_MAXIMO = 2**15 - 1
+
+  # Constructor (nvars = número de variables t1, ..., tn)
+  def __init__(self, nvars, terminos = None):
+
+    self.nvars = nvars
+    self.terminos = {} if terminos is None else \
+      {e: c for e, c in terminos.items() if c != 0}
+
+  # Comprueba que los exponentes entre 'minimo' y 'maximo' caben en su campo
+  @classmethod
+  def ComprobarExponentes(cls, minimo, maximo):
+
+    if minimo < cls.EXPONENTE_MINIMO or maximo > cls.EXPONENTE_MAXIMO:
+      raise OverflowError("Exponente fuera del rango [{}, {}] de la clave "
+                          "empaquetada".format(cls.EXPONENTE_MINIMO,
+                                               cls.EXPONENTE_MAXIMO))
+
+  # Exponentes mínimo y máximo de cada variable entre todos los términos
+  def RangoExponentes(self):
+
+    exponentes = [self.Exponentes(clave) for clave in self.terminos]
+    return ([min(columna) for columna in zip(*exponentes)],
+            [max(columna) for columna in zip(*exponentes)])
+
+  # Empaqueta una tupla de exponentes en su clave entera
+  @classmethod
+  def Clave(cls, exponentes):
+
+    if exponentes:
+      cls.ComprobarExponentes(min(exponentes), max(exponentes))
+    return sum((e + cls.DESPLAZAMIENTO) << (cls.BITS * i)
+               for i, e in enumerate(exponentes))
+
+  # Desempaqueta la clave entera en su tupla de exponentes
+  def Exponentes(self, clave):
+
+    mascara = (1 << self.BITS) - 1
+    return tuple(((clave >> (self.BITS * i)) & mascara) - self.DESPLAZAMIENTO
+                 for i in range(self.nvars))
+
+  # Polinomio constante
+  @classmethod
+  def Constante(cls, c, nvars):
+
+    return cls(nvars, {cls.Clave((0,) * nvars): c})
+
+  # Monomio c * t_i^exponente (i empieza en 0)
+  @classmethod
+  def Variable(cls, i, nvars, exponente = 1, c = 1):
+
+    cls.ComprobarExponentes(exponente, exponente)
+    return cls(nvars, {cls.Clave((0,) * nvars) +
+                       (exponente << (cls.BITS * int(i))): c})
+
+  def EsCero(self):
+
+    return not self.terminos
+
+  def __add__(self, otro):
+
+    if not isinstance(otro, PolinomioLaurent):
+      otro = PolinomioLaurent.Constante(otro, self.nvars)
+    terminos = dict(self.terminos)
+    for e, c in otro.terminos.items():
+      suma = terminos.get(e, 0) + c
+      if suma:
+        terminos[e] = suma
+      else:
+        terminos.pop(e, None)
+
+    resultado = PolinomioLaurent(self.nvars)
+    resultado.terminos = terminos
+    return resultado
+
+  __radd__ = __add__
+
+  # Suma in situ (evita copiar los términos del polinomio acumulado)
+  def __iadd__(self, otro):
+
+    terminos = self.terminos
+    for e, c in otro.terminos.items():
+      suma = terminos.get(e, 0) + c
+      if suma:
+        terminos[e] = suma
+      else:
+        del terminos[e]
+
+    return self
+
+  def __neg__(self):
+
+    return PolinomioLaurent(self.nvars,
+                            {e: -c for e, c in self.terminos.items()})
+
+  def __sub__(self, otro):
+
+    return self + (-otro)
+
+  # Producto por el monomio c * t_i^exponente (desplaza las claves)
+  def MultiplicarMonomio(self, c, i, exponente):
+
+    if self.terminos:
+      minimos, maximos = self.RangoExponentes()
+      self.ComprobarExponentes(minimos[i] + exponente, maximos[i] + exponente)
+    desplazamiento = exponente << (self.BITS * int(i))
+    resultado = PolinomioLaurent(self.nvars)
+    resultado.terminos = {e + desplazamiento: coef * c
+                          for e, coef in self.terminos.items()}
+    return resultado
+
+  def __mul__(self, otro):
+
+    if not isinstance(otro, PolinomioLaurent):
+      return PolinomioLaurent(self.nvars,
+                              {e: c * otro for e, c in self.terminos.items()})
+
+    # Los exponentes del producto están entre las sumas de los mínimos y de
+    # los máximos de cada variable
+    if self.terminos and otro.terminos:
+      minimos1, maximos1 = self.RangoExponentes()
+      minimos2, maximos2 = otro.RangoExponentes()
+      for k in range(self.nvars):
+        self.ComprobarExponentes(minimos1[k] + minimos2[k],
+                                 maximos1[k] + maximos2[k])
+
+    # Producto término a término: sumar claves equivale a sumar exponentes
+    constante = self.Clave((0,) * self.nvars)
+    terminos = {}
+    for e2, c2 in otro.terminos.items():
+      desplazamiento = e2 - constante
+      for e1, c1 in self.terminos.items():
+        e = e1 + desplazamiento
+        terminos[e] = terminos.get(e, 0) + c1 * c2
+
+    return PolinomioLaurent(self.nvars, terminos)
+
+  __rmul__ = __mul__
+
+  def __eq__(self, otro):
+
+    if not isinstance(otro, PolinomioLaurent):
+      otro = PolinomioLaurent.Constante(otro, self.nvars)
+    return self.terminos == otro.terminos
+
+  # Evaluación exacta en los valores dados (uno por variable)
+  def Evaluar(self, valores):
+
+    resultado = Fraction(0)
+    for clave, c in self.terminos.items():
+      termino = Fraction(c)
+      for v, k in zip(valores, self.Exponentes(clave)):
+        termino *= Fraction(v) ** k
+      resultado += termino
+
+    return resultado
+
+  # Conversión a expresión de SymPy en las variables dadas
+  def ASympy(self, variables):
+
+    return Add(*[c * Mul(*[v**k for v, k in zip(variables,
+                                                  self.Exponentes(clave))])
+                 for clave, c in self.terminos.items()])
+
+  def __str__(self):
+
+    return str(self.ASympy(symbols("t1:%d" % (self.nvars + 1))))
+
+  __repr__ = __str__
+
+# Matriz de polinomios de Laurent (lista de filas). Sus productos se mantienen
+# normalizados sin necesidad de llamar a 'expand'
+class MatrizLaurent:
+
+  __slots__ = ("filas",)
+
+  # Constructor
+  def __init__(self, filas):
+
+    self.filas = [list(fila) for fila in filas]
+
+  # Matriz identidad grado x grado
+  @classmethod
+  def Identidad(cls, grado, nvars):
+
+    return cls([[PolinomioLaurent.Constante(int(i == j), nvars)
+                 for j in range(grado)] for i in range(grado)])
+
+  @property
+  def shape(self):
+
+    return len(self.filas), len(self.filas[0])
+
+  def __getitem__(self, posicion):
+
+    return self.filas[posicion[0]][posicion[1]]
+
+  def __setitem__(self, posicion, valor):
+
+    self.filas[posicion[0]][posicion[1]] = valor
+
+  # Producto de matrices (omitiendo las entradas nulas)
+  def __mul__(self, otra):
+
+    n, m = len(self.filas), len(otra.filas[0])
+    nvars = self.filas[0][0].nvars
+    resultado = []
+    for i in range(n):
+      fila = [PolinomioLaurent(nvars) for _ in range(m)]
+      for k, a in enumerate(self.filas[i]):
+        if a.EsCero():
+          continue
+        for j, b in enumerate(otra.filas[k]):
+          if not b.EsCero():
+            fila[j] = fila[j] + a * b
+      resultado.append(fila)
+
+    return MatrizLaurent(resultado)
+
+  def __eq__(self, otra):
+
+    return self.filas == otra.filas
+
+  # Conversión a matriz de SymPy en las variables dadas
+  def ASympy(self, variables):
+
+    return Matrix([[p.ASympy(variables) for p in fila] for fila in self.filas])
+
+# Producto de polinomios univariables densos sobre CF(2^gradoCF) (arrays de
+# coeficientes de menor a mayor grado). Por encima de UMBRAL_KARATSUBA
+# coeficientes se aplica Karatsuba (en característica 2 restar es sumar)
+UMBRAL_KARATSUBA = 32
+
+def ProductoDensoCF(a, b, CF):
+
+  if (len(a) == 0 or len(b) == 0):
+    return np.zeros(0, dtype=CF.dtype)
+
+  # Producto escolar: todos los productos a_i * b_j sumados por i + j
+  if (min(len(a), len(b)) <= UMBRAL_KARATSUBA):
+    producto = np.zeros(len(a) + len(b) - 1, dtype=CF.dtype)
+    indices = np.add.outer(np.arange(len(a)), np.arange(len(b)))
+    np.bitwise_xor.at(producto, indices.ravel(),
+                      CF.Multiply(a[:, None], b[None, :]).ravel())
+    return producto
+
+  # Karatsuba: a = a0 + a1 x^m, b = b0 + b1 x^m
+  m = max(len(a), len(b)) // 2
+  a0, a1 = a[:m], a[m:]
+  b0, b1 = b[:m], b[m:]
+  p0 = ProductoDensoCF(a0, b0, CF)
+  p2 = ProductoDensoCF(a1, b1, CF)
+  p1 = ProductoDensoCF(SumaDensaCF(a0, a1), SumaDensaCF(b0, b1), CF)
+  p1 = SumaDensaCF(SumaDensaCF(p1, p0), p2)
+
+  producto = np.zeros(len(a) + len(b) - 1, dtype=CF.dtype)
+  producto[:len(p0)] ^= p0
+  producto[m:m + len(p1)] ^= p1
+  producto[2*m:2*m + len(p2)] ^= p2
+
+  return producto
+
+# Suma de polinomios univariables densos (de distinta longitud) sobre el campo
+def SumaDensaCF(a, b):
+
+  if (len(a) < len(b)):
+    a, b = b, a
+  suma = a.copy()
+  suma[:len(b)] ^= b
+
+  return suma
+
+# Polinomio de Laurent sobre CF(2^gradoCF) en una o varias variables,
+# representado por un array denso de coeficientes (un eje por variable) y el
+# exponente que corresponde al índice 0 de cada eje ('desplazamiento')
+class PolinomioLaurentCF:
+
+  __slots__ = ("gradoCF", "coeficientes", "desplazamiento")
+
+  # Constructor (se recortan los bordes nulos para normalizar)
+  def __init__(self, gradoCF, coeficientes, desplazamiento = None):
+
+    CF = ObtenerCampoFinito(gradoCF)
+    coeficientes = np.atleast_1d(np.asarray(coeficientes, dtype=CF.dtype))
+    if (desplazamiento is None):
+      desplazamiento = (0,) * coeficientes.ndim
+    desplazamiento = list(desplazamiento)
+
+    if not np.any(coeficientes):
+      coeficientes = np.zeros((0,) * coeficientes.ndim, dtype=CF.dtype)
+      desplazamiento = [0] * coeficientes.ndim
+    else:
+      recorte = []
+      for eje in range(coeficientes.ndim):
+        otros = tuple(i for i in range(coeficientes.ndim) if i != eje)
+        no_nulos = np.nonzero(np.any(coeficientes, axis=otros))[0]
+        recorte.append(slice(no_nulos[0], no_nulos[-1] + 1))
+        desplazamiento[eje] += int(no_nulos[0])
+      coeficientes = coeficientes[tuple(recorte)]
+
+    self.gradoCF = gradoCF
+    self.coeficientes = coeficientes
+    self.desplazamiento = tuple(desplazamiento)
+
+  # Constante c del campo en nvars variables
+  @classmethod
+  def Constante(cls, c, gradoCF, nvars = 1):
+
+    return cls(gradoCF, np.full((1,) * nvars, c))
+
+  # Monomio c * t_i^exponente (i empieza en 0)
+  @classmethod
+  def Variable(cls, i, gradoCF, nvars = 1, exponente = 1, c = 1):
+
+    desplazamiento = [0] * nvars
+    desplazamiento[i] = exponente
+    return cls(gradoCF, np.full((1,) * nvars, c), desplazamiento)
+
+  # Reduce a CF(2^gradoCF) un PolinomioLaurent con coeficientes enteros (en
+  # característica 2 solo importa la paridad de cada coeficiente)
+  @classmethod
+  def DesdeLaurent(cls, polinomio, gradoCF):
+
+    terminos = [(polinomio.Exponentes(clave), c % 2)
+                for clave, c in polinomio.terminos.items() if c % 2]
+    if not terminos:
+      return cls(gradoCF, np.zeros((1,) * polinomio.nvars))
+
+    exponentes = np.array([e for e, _ in terminos]).reshape(-1, polinomio.nvars)
+    minimo = exponentes.min(axis=0)
+    coeficientes = np.zeros(tuple(exponentes.max(axis=0) - minimo + 1))
+    coeficientes[tuple((exponentes - minimo).T)] = 1
+
+    return cls(gradoCF, coeficientes, tuple(int(x) for x in minimo))
+
+  @property
+  def nvars(self):
+
+    return self.coeficientes.ndim
+
+  def EsCero(self):
+
+    return self.coeficientes.size == 0
+
+  # Suma (y resta): se alinean los desplazamientos y se suman con XOR
+  def __add__(self, otro):
+
+    if not isinstance(otro, PolinomioLaurentCF):
+      otro = PolinomioLaurentCF.Constante(otro, self.gradoCF, self.nvars)
+    if self.EsCero():
+      return otro
+    if otro.EsCero():
+      return self
+
+    inicio = [min(a, b) for a, b in zip(self.desplazamiento, otro.desplazamiento)]
+    fin = [max(a + n, b + m) for a, n, b, m in zip(
+      self.desplazamiento, self.coeficientes.shape,
+      otro.desplazamiento, otro.coeficientes.shape)]
+    suma = np.zeros([f - i for i, f in zip(inicio, fin)],
+                    dtype=self.coeficientes.dtype)
+    for polinomio in (self, otro):
+      region = tuple(slice(d - i, d - i + n) for d, i, n in zip(
+        polinomio.desplazamiento, inicio, polinomio.coeficientes.shape))
+      suma[region] ^= polinomio.coeficientes
+
+    return PolinomioLaurentCF(self.gradoCF, suma, inicio)
+
+  __radd__ = __add__
+  __sub__ = __add__
+
+  # Producto: en varias variables se reduce a uno univariable por sustitución de
+  # Kronecker (se aplanan los arrays con ejes de longitud suficiente para que
+  # las sumas de índices no se solapen)
+  def __mul__(self, otro):
+
+    CF = ObtenerCampoFinito(self.gradoCF)
+    if not isinstance(otro, PolinomioLaurentCF):
+      return PolinomioLaurentCF(self.gradoCF,
+                                CF.Multiply(self.coeficientes, otro),
+                                self.desplazamiento)
+    if self.EsCero() or otro.EsCero():
+      return PolinomioLaurentCF(self.gradoCF, np.zeros((1,) * self.nvars))
+
+    forma = tuple(n + m - 1 for n, m in zip(self.coeficientes.shape,
+                                            otro.coeficientes.shape))
+    aplanados = []
+    for polinomio in (self, otro):
+      incrustado = np.zeros(forma, dtype=CF.dtype)
+      incrustado[tuple(slice(0, n) for n in polinomio.coeficientes.shape)] = \
+        polinomio.coeficientes
+      aplanados.append(incrustado.ravel())
+    producto = ProductoDensoCF(aplanados[0], aplanados[1], CF)[:int(np.prod(forma))]
+
+    return PolinomioLaurentCF(self.gradoCF, producto.reshape(forma),
+                              [a + b for a, b in zip(self.desplazamiento,
+                                                     otro.desplazamiento)])
+
+  __rmul__ = __mul__
+
+  def __eq__(self, otro):
+
+    if not isinstance(otro, PolinomioLaurentCF):
+      otro = PolinomioLaurentCF.Constante(otro, self.gradoCF, self.nvars)
+    return (self.desplazamiento == otro.desplazamiento and
+            np.array_equal(self.coeficientes, otro.coeficientes))
+
+  # Evaluación en puntos del campo: 'puntos' contiene un valor por variable (o
+  # un array (K, nvars) de K asignaciones, devolviendo K evaluaciones)
+  def Evaluar(self, puntos):
+
+    CF = ObtenerCampoFinito(self.gradoCF)
+    puntos = np.asarray(puntos, dtype=CF.dtype)
+    unico = puntos.ndim <= 1
+    puntos = puntos.reshape(-1, self.nvars)
+
+    indices = np.nonzero(self.coeficientes)
+    exponentes = np.stack(indices, axis=1) + np.array(self.desplazamiento)
+    ceros = (puntos == 0).astype(np.int64)
+    if np.any(ceros @ (exponentes < 0).T):
+      raise ZeroDivisionError("El 0 no es invertible en el campo finito")
+
+    # Cada término c * prod(x_j^e_j) se obtiene sumando logaritmos
+    logaritmos = CF.log[puntos].astype(np.int64) @ exponentes.T + \
+      CF.log[self.coeficientes[indices]]
+    valores = CF.exp[logaritmos % (CF.orden - 1)]
+    valores[(ceros @ (exponentes != 0).T) > 0] = 0
+    resultado = np.bitwise_xor.reduce(valores, axis=1)
+
+    return resultado[0] if unico else resultado
+
+  def __str__(self):
+
+    indices = np.nonzero(self.coeficientes)
+    terminos = []
+    for termino in zip(*indices):
+      e = [int(i) + d for i, d in zip(termino, self.desplazamiento)]
+      monomio = "*".join("t%d^%d" % (j + 1, k) for j, k in enumerate(e) if k)
+      c = int(self.coeficientes[termino])
+      terminos.append(("%d*%s" % (c, monomio)) if monomio else str(c))
+
+    return " + ".join(terminos) if terminos else "0"
+
+  __repr__ = __str__
+
 if __name__ == "__main__":
 
     print("\nOPERACIONES BÁSICAS SOBRE POLINOMIOS DE LAURENT:\n")
@@ -78,4 +540,21 @@ if __name__ == "__main__":
     #f_CFinito = F32.ShowPolynomial(f)
     #f123 = F32.Add(10,x)
 
-    # ESTOS INTENTOS DE INTERGAR PYFINITE EN SYMPY FALLAN
\ No newline at end of file
+    # ESTOS INTENTOS DE INTERGAR PYFINITE EN SYMPY FALLAN
+
+    print("POLINOMIOS DE LAURENT SOBRE F32 ('PolinomioLaurentCF'):\n")
+
+    t1_CF = PolinomioLaurentCF.Variable(0, 5, nvars = 2)
+    t2_CF = PolinomioLaurentCF.Variable(1, 5, nvars = 2)
+    t2_inv_CF = PolinomioLaurentCF.Variable(1, 5, nvars = 2, exponente = -1)
+    g1 = t1_CF * 3 + t2_inv_CF
+    g2 = t1_CF * t2_CF + 7
+    print("g1 =", g1)
+    print("g2 =", g2)
+    print("g1 + g2 =", g1 + g2)
+    print("g1 * g2 =", g1 * g2)
+    print("g1 * g2 evaluado en (t1, t2) = (2, 9):", (g1 * g2).Evaluar([2, 9]))
+
+    # Grado alto para ejercitar Karatsuba
+    h = PolinomioLaurentCF(5, np.random.randint(0, 32, 200), [-100])
+    print("\nGrado de h * h:", (h * h).coeficientes.shape[0] - 1, "\n")
\ No newline at end of file
@@ -2,72 +2,118 @@
 
 
 from permutation import *
+from array import array
+import hashlib
+import numpy as np
 #from sympy.combinatorics import Permutation
 
 # Clase que representará a las trenzas
+  # La palabra se almacena como array de enteros de 8 bits ('b') y la
+  # permutación asociada solo se calcula (y se guarda) la primera vez que se
+  # consulta
 class Braid:
 
+  __slots__ = ("grado", "_palabra", "_perm", "_elementos")
+
   # Constructor
   def __init__(self, grado = 1, elementos = []):
-    if (elementos == []):
-      self.grado = grado          # Grado del grupo al que pertenecen
-      self.elementos = elementos  # Palabra que representa a la trenza
-      self.perm = Permutation(0)  # Permutación identidad
+
+    self._palabra = array('b', elementos)  # Palabra que representa a la trenza
+    self._perm = None                      # Permutación (se calcula al usarla)
+    self._elementos = None                 # Palabra como lista (ídem)
 
     # En cualquier momento una trenza que fue definida para el grupo i-ésimo
     # podrá utilizarse como trenza del grupo j-ésimo, para i < j,
     # actualizándose el grupo (atributo grado) al que pertenece. Este
     # comportamiento se da en su propia definición, como ocurre justo aquí
+    if (len(self._palabra) == 0):
+      self.grado = grado          # Grado del grupo al que pertenecen
     else:
-      self.grado = grado if grado > max(abs(x) for x in elementos) + 1\
-                        else max(abs(x) for x in elementos) + 1
-      self.elementos = elementos
-      self.perm = ProyectarSn(elementos, grado)  # proyección de la trenza sobre Sn
+      self.grado = max(grado, max(map(abs, self._palabra)) + 1)
+
+  # Palabra que representa a la trenza (como lista, que no debe modificarse)
+  @property
+  def elementos(self):
+
+    if (self._elementos is None):
+      self._elementos = self._palabra.tolist()
+    return self._elementos
+
+  @elementos.setter
+  def elementos(self, elementos):
+
+    self._palabra = array('b', elementos)
+    self._elementos = None
+    self._perm = None
+
+  # Proyección de la trenza sobre Sn
+  @property
+  def perm(self):
+
+    if (self._perm is None):
+      self._perm = ProyectarSn(self._palabra, self.grado)
+    return self._perm
+
+  @perm.setter
+  def perm(self, perm):
+
+    self._perm = perm
 
   # Visualizamos las trenzas con el formato [g1, g2, g3]
   def showBraid(self):
-    indices = [str(self.elementos[i]) for i in range(len(self.elementos))]
+    indices = [str(elemento) for elemento in self._palabra]
     palabra  = "[" + " ".join(indices) + "]"
     return palabra
 
   # Concatenamos 2 trenzas (operación del grupo trenzado)
   def concatenateBraid(self, trenza):
 
-    resultado = Braid()
-
     # Permitimos multiplicar 2 trenzas pertenecientes a grupos de distinto
     # orden, simplemente incluimos el resultado en el grupo de orden mayor
     # (los generadores del grupo menor pertenecen al grupo mayor)
-    resultado.grado = self.grado if self.grado > trenza.grado else trenza.grado
+    resultado = Braid(max(self.grado, trenza.grado))
 
     # Concatenamos generadores de ambas trenzas
-    resultado.elementos = self.elementos + trenza.elementos
+    resultado._palabra = self._palabra + trenza._palabra
 
-    # Multiplicamos sus permutaciones asociadas
-    resultado.perm = self.perm * trenza.perm
+    # Componemos sus permutaciones asociadas si ya estaban calculadas (primero
+    # actúa la de la segunda trenza, como en ProyectarSn)
+    if (self._perm is not None and trenza._perm is not None):
+      resultado._perm = trenza._perm * self._perm
 
     return resultado
 
   # Calculamos la trenza inversa
   def inverseBraid(self):
 
-    #elementos_invertidos = [-elem for elem in reversed(self.elementos)]
-    elementos_invertidos = InverseWord(self.elementos)
-    trenza_inversa = Braid(self.grado, elementos_invertidos)
+    trenza_inversa = Braid(self.grado)
+    trenza_inversa._palabra = array('b', InverseWord(self._palabra))
+    if (self._perm is not None):
+      trenza_inversa._perm = self._perm ** (-1)
 
     return trenza_inversa
 
   # Reducimos la trenza (se eliminan gen*gen^(-1))
   def ReduccionLibre(self):
 
-    i = 0
-    while i < len(self.elementos) - 1:
-      # Si dos consecutivos son opuestos
-      if self.elementos[i] == -self.elementos[i + 1]:
-          del self.elementos[i:i+2]   # Se eliminan gen*gen^(-1)
-          i -= 1                      # Han podido generarse nuevos gen*gen^(-1)
-      else:
-          i += 1
+    ReduccionLibre(self._palabra)   # No cambia la permutación
+    self._elementos = None
+
+  # Comprobamos si la trenza es trivial (reducción de handles)
+  def EsTrivial(self, max_iteraciones = None, estadisticas = None):
+
+    return EsTrivial(self._palabra, max_iteraciones, estadisticas)
+
+  # Huella de la trenza (Burau coloreada evaluada en un cuerpo primo)
+  def Huella(self, semilla = 0, repeticiones = 2):
+
+    return HuellaBurau(self._palabra, self.grado, semilla, repeticiones)
+
+  # Comprobamos si dos trenzas son iguales (reducción de handles)
+  def EsIgual(self, trenza, max_iteraciones = None, estadisticas = None):
+
+    return PalabrasIguales(self._palabra, trenza._palabra, max_iteraciones,
+                           estadisticas)
 
   # Calcula una representación (palabra) de la trenza fundamental del grupo
   # trenzando n-ésimo (n pasado por parámetro) tomando el generador i-esimo
@@ -105,32 +151,211 @@ def InverseWord(palabra):
 # Método auxiliar para proyectar una trenza sobre Sn
 def ProyectarSn(palabra, grado):
 
-  proyeccion = Permutation(0)
-  # Necesaria para no perder las colas de elementos invariantes tras aplicarla
-  perm_identity = Permutation(range(grado))
-
-  # Recorremos los generadores que forman la palabra
-  for i in reversed(palabra):
-    # Permutación que describe los cruces ri y ri^-1
-    perm_aux = Permutation(abs(i)-1, abs(i))
-    proyeccion = proyeccion * perm_aux
+  # Partimos de la identidad (con tamaño suficiente para no perder las colas de
+  # elementos invariantes ni los generadores de grupos mayores)
+  grado = max([grado] + [abs(i) + 1 for i in palabra])
+  proyeccion = list(range(grado))
 
-  proyeccion = proyeccion * perm_identity
+  # Recorremos los generadores que forman la palabra: cada cruce ri y ri^-1
+  # intercambia las posiciones i-1 e i
+  for i in palabra:
+    i = abs(i)
+    proyeccion[i-1], proyeccion[i] = proyeccion[i], proyeccion[i-1]
 
-  return proyeccion
+  return Permutacion(proyeccion)
 
-# Método auxiliar para aplicar la reducción libre a una palabra
+# Método auxiliar para aplicar la reducción libre a una palabra (in situ, sobre
+# listas o arrays). Se recorre una única vez, usando el propio comienzo de la
+# palabra como pila: cada generador cancela la cima si es su inverso y si no se
+# apila, por lo que el coste es lineal
 def ReduccionLibre(palabra):
 
-  i = 0
-  while i < len(palabra) - 1:
-    if palabra[i] == -palabra[i + 1]: # Si dos consecutivos son opuestos
-        del palabra[i:i+2]            # Se eliminan gen*gen^(-1)
-        i = i - 2 if i >= 2 else 0    # Han podido generarse nuevos gen*gen^(-1)
+  cima = 0                            # Longitud de la parte ya reducida
+  for gen in palabra:
+    if cima > 0 and palabra[cima - 1] == -gen:
+      cima -= 1                       # Se eliminan gen*gen^(-1)
     else:
-        i += 1
+      palabra[cima] = gen
+      cima += 1
+  del palabra[cima:]
+
   return palabra
 
+# Reducción libre en flujo: los generadores se van reduciendo a medida que se
+# añaden (por ejemplo, al concatenar varias palabras), sin construir antes la
+# palabra completa. La palabra reducida se guarda en un array de 8 bits
+class ReductorLibre:
+
+  __slots__ = ("palabra",)
+
+  # Constructor
+  def __init__(self, palabra = ()):
+
+    self.palabra = array('b')
+    self.extend(palabra)
+
+  # Añade un generador
+  def append(self, gen):
+
+    if self.palabra and self.palabra[-1] == -gen:
+      self.palabra.pop()
+    else:
+      self.palabra.append(gen)
+
+  # Añade todos los generadores de una palabra
+  def extend(self, palabra):
+
+    pila = self.palabra
+    for gen in palabra:
+      if pila and pila[-1] == -gen:
+        pila.pop()
+      else:
+        pila.append(gen)
+
+  def __len__(self):
+
+    return len(self.palabra)
+
+  def __iter__(self):
+
+    return iter(self.palabra)
+
+  # Palabra reducida como lista
+  def tolist(self):
+
+    return self.palabra.tolist()
+
+
+# Reducción de handles de Dehornoy. Un σi-handle es una subpalabra
+# σi^e·w·σi^(-e) en la que w solo tiene generadores de índice mayor que i, y se
+# reduce sustituyendo cada σi+1^d de w por σi+1^(-e)·σi^d·σi+1^e y quitando los
+# extremos. Reduciendo siempre el handle que acaba más a la izquierda el
+# proceso termina, y la palabra es trivial si y solo si queda vacía. Devuelve
+# la palabra reducida (array de 8 bits), o None si se llega a
+# 'max_iteraciones' reducciones. En el diccionario 'estadisticas' (si se pasa)
+# se guardan el número de reducciones y las longitudes máxima y final
+def ReduccionHandles(palabra, max_iteraciones = None, estadisticas = None):
+
+  # La palabra se recorre con dos pilas: 'leida' (ya revisada, sin handles) y
+  # 'pendiente' (lo que falta por leer, con el siguiente generador en la cima).
+  # Al reducir un handle, su parte reducida se devuelve a 'pendiente', así que
+  # cada reducción solo cuesta lo que mide el handle
+  pendiente = array('b', reversed(palabra))
+  leida = array('b')
+  grado = max([0] + [abs(gen) for gen in palabra]) + 1
+  posiciones = [[] for _ in range(grado)]   # Posiciones de cada σi en 'leida'
+  reducciones = 0
+  longitud_maxima = len(pendiente)
+
+  while pendiente:
+    gen = pendiente.pop()
+    i = abs(gen)
+
+    # Reducción Libre (gen·gen^(-1))
+    if leida and leida[-1] == -gen:
+      posiciones[i].pop()
+      leida.pop()
+      continue
+
+    # Último generador leído de índice <= i
+    k = max((p[-1] for p in posiciones[1:i + 1] if p), default = -1)
+    if k < 0 or leida[k] != -gen:
+      posiciones[i].append(len(leida))
+      leida.append(gen)
+      continue
+
+    # Hay un σi-handle que empieza en la posición k y acaba en gen
+    if max_iteraciones is not None and reducciones >= max_iteraciones:
+      leida = None
+      break
+    reducciones += 1
+    e = 1 if leida[k] > 0 else -1
+    for x in reversed(leida[k:]):
+      posiciones[abs(x)].pop()
+    cuerpo = leida[k + 1:]
+    del leida[k:]
+    for x in reversed(cuerpo):
+      if abs(x) == i + 1:
+        pendiente.extend((e * (i + 1), i if x > 0 else -i, -e * (i + 1)))
+      else:
+        pendiente.append(x)
+    longitud_maxima = max(longitud_maxima, len(leida) + len(pendiente))
+
+  if estadisticas is not None:
+    estadisticas["reducciones"] = reducciones
+    estadisticas["longitud_maxima"] = longitud_maxima
+    estadisticas["longitud_final"] = None if leida is None else len(leida)
+
+  return leida
+
+# Comprueba si la palabra representa la trenza trivial (None si no se ha
+# podido decidir antes de llegar a 'max_iteraciones' reducciones)
+def EsTrivial(palabra, max_iteraciones = None, estadisticas = None):
+
+  reducida = ReduccionHandles(palabra, max_iteraciones, estadisticas)
+  if reducida is None:
+    return None
+  return len(reducida) == 0
+
+# Comprueba si dos palabras representan la misma trenza (palabra1·palabra2^(-1)
+# trivial)
+def PalabrasIguales(palabra1, palabra2, max_iteraciones = None,
+                    estadisticas = None):
+
+  return EsTrivial(list(palabra1) + InverseWord(palabra2), max_iteraciones,
+                   estadisticas)
+
+
+# Primo (2^31 - 1) del cuerpo en el que se evalúa la huella: los productos de
+# dos elementos caben en enteros de 64 bits
+PRIMO_HUELLA = 2**31 - 1
+
+# Huella de tamaño fijo de la trenza representada por 'palabra': se evalúa su
+# representación de Burau coloreada (con la semántica de MatrizBurauGen) en
+# 'repeticiones' juegos de t_values aleatorios de Z/(PRIMO_HUELLA), generados a
+# partir de 'semilla', y se resume el par (matriz, permutación) con SHA-256.
+# Trenzas iguales dan siempre la misma huella (para el mismo grado, semilla y
+# repeticiones), pero la representación no es fiel, así que dos trenzas
+# distintas pueden coincidir (con probabilidad muy baja para palabras
+# aleatorias). Coste lineal en la longitud de la palabra
+def HuellaBurau(palabra, grado, semilla = 0, repeticiones = 2):
+
+  p = PRIMO_HUELLA
+  grado = max([grado] + [abs(gen) + 1 for gen in palabra])
+  generador = np.random.default_rng(semilla)
+  t_values = generador.integers(2, p - 1, size=(repeticiones, grado),
+                                dtype=np.int64)
+  t_inversos = np.array([[pow(int(t), p - 2, p) for t in fila]
+                         for fila in t_values], dtype=np.int64)
+
+  # Una matriz por repetición, multiplicada por la derecha por la matriz de
+  # cada generador (solo cambian las columnas fila-1, fila y fila+1)
+  M = np.broadcast_to(np.eye(grado, dtype=np.int64),
+                      (repeticiones, grado, grado)).copy()
+  perm = list(range(grado))
+  for gen in palabra:
+    fila = abs(gen) - 1
+    columna = M[:, :, fila].copy()
+    if gen > 0:
+      t = t_values[:, perm[gen - 1], None]
+      if fila > 0:
+        M[:, :, fila - 1] = (M[:, :, fila - 1] + columna * t) % p   # t
+      M[:, :, fila] = (-columna * t) % p                            # -t
+      M[:, :, fila + 1] = (M[:, :, fila + 1] + columna) % p         # 1
+    else:
+      t = t_inversos[:, perm[-gen], None]
+      if fila > 0:
+        M[:, :, fila - 1] = (M[:, :, fila - 1] + columna) % p       # 1
+      M[:, :, fila] = (-columna * t) % p                            # -t^-1
+      M[:, :, fila + 1] = (M[:, :, fila + 1] + columna * t) % p     # t^-1
+    perm[fila], perm[fila + 1] = perm[fila + 1], perm[fila]
+
+  huella = hashlib.sha256()
+  huella.update(M.tobytes())
+  huella.update(np.array(perm, dtype=np.int64).tobytes())
+
+  return huella.hexdigest()
+
 
 if __name__ == "__main__":
 
@@ -186,4 +411,29 @@ if __name__ == "__main__":
   trenzaFundamental_10_9 = Braid(10, Braid.TrenzaFundamental(10, 9))
   print("\nTrenza fundamental de grado 10 (\"pivotando\" desde el generador 9):")
   print(trenzaFundamental_10_9.showBraid())
-  print("\n")
\ No newline at end of file
+  print("\n")
+
+  print("REDUCCIÓN LIBRE:\n")
+  palabra = [1, 2, -2, 3, -3, -1, 4, 5, -5]
+  print("Palabra:", palabra)
+  print("Reducida in situ:", ReduccionLibre(list(palabra)))
+  reductor = ReductorLibre([1, 2, 3])
+  reductor.extend([-3, -2, 4])
+  print("Reducida en flujo ([1 2 3] + [-3 -2 4]):", reductor.tolist(), "\n")
+
+  print("REDUCCIÓN DE HANDLES:\n")
+  trenza1 = Braid(4, [1, 2, 1, 3, -2])
+  trenza2 = Braid(4, [2, 1, 2, 3, -2])
+  estadisticas = {}
+  print("Trenza 1:", trenza1.showBraid())
+  print("Trenza 2:", trenza2.showBraid())
+  print("¿Son iguales?:", trenza1.EsIgual(trenza2, estadisticas = estadisticas))
+  print("Estadísticas:", estadisticas)
+  print("¿Es trivial la trenza 1?:", trenza1.EsTrivial())
+  print("Reducción de handles de la trenza 1:",
+        ReduccionHandles(trenza1.elementos).tolist(), "\n")
+
+  print("HUELLA DE BURAU:\n")
+  print("Huella de la trenza 1:", trenza1.Huella())
+  print("Huella de la trenza 2:", trenza2.Huella())
+  print("Huella de la trenza 1 con otra semilla:", trenza1.Huella(semilla = 1), "\n")
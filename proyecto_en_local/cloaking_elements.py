@@ -1,5 +1,7 @@
 
 import random
+import threading
+from collections import OrderedDict, deque
 from E_Multiplication import *
 
 # Comprueba si los t_values contienen al menos 2 t_unos (principio y final no
@@ -54,22 +56,51 @@ def Palabra_aleatoria(n, l1, l2):
   return palabra
 
 # Genera la trenza que junto a "generador" define el Cloak Element
-def Generador_trenza_cloak(generador, permutacionM, t_unos, gradoBn):
-
-  # Generamos aleatoriamente la potencial trenza junto con su permutacion
-  # aplicada a generador y generador + 1 a comparar con (*)
-  palabra_generada = Palabra_aleatoria(gradoBn, gradoBn*5, gradoBn*10)
-  permutacion_generada = ProyectarSn(palabra_generada, gradoBn)
-
-  # Repetimos el proceso hasta que se den las condiciones para los t_unos
-  while ((AplicarPermPos(permutacion_generada,generador-1) != AplicarPermPos(permutacionM**(-1),t_unos[0])) or
-         (AplicarPermPos(permutacion_generada, generador) != AplicarPermPos(permutacionM**(-1),t_unos[1]))):
-    palabra_generada = Palabra_aleatoria(gradoBn, gradoBn*5, gradoBn*10)
-    permutacion_generada = ProyectarSn(palabra_generada, gradoBn)
-
-  # Una vez encontrada la palabra cuya permutacion proyeccion cumple los 2
-  # requisitos del procedimiento, creamos formalmente la trenza asociada
-  trenza_Cloak = Braid(gradoBn, palabra_generada)
+  # En lugar de repetir palabras aleatorias hasta que su permutación cumpla las
+  # condiciones (*), se parte de una palabra aleatoria (que oculta la
+  # construcción) y se le añade una secuencia corta de cruces, con signos
+  # aleatorios, que lleva las hebras pedidas a las posiciones generador-1 y
+  # generador. El coste queda acotado (a lo sumo unos 4*gradoBn cruces de
+  # corrección). Si se pasa el diccionario 'estadisticas' se guardan en él las
+  # longitudes de la parte aleatoria, de la corrección y de la palabra final
+def Generador_trenza_cloak(generador, permutacionM, t_unos, gradoBn,
+                           estadisticas = None):
+
+  # Hebras que deben acabar en las posiciones generador-1 y generador (*)
+  hebra_a = AplicarPermPos(permutacionM**(-1), t_unos[0])
+  hebra_b = AplicarPermPos(permutacionM**(-1), t_unos[1])
+
+  # Palabra aleatoria y posición en la que deja cada hebra
+  palabra_aleatoria = Palabra_aleatoria(gradoBn, gradoBn*5, gradoBn*10)
+  proyeccion = [int(x) for x in
+                ProyectarSn(palabra_aleatoria, gradoBn).array_form]
+
+  # Cada cruce ri^(+-1) intercambia las posiciones i-1 e i
+  correccion = []
+  def Cruce(i):
+    correccion.append(random.choice([1, -1]) * i)
+    proyeccion[i-1], proyeccion[i] = proyeccion[i], proyeccion[i-1]
+
+  # La hebra a baja a la posición 0 y la b a la 1; después la b sube hasta
+  # 'generador' y la a hasta 'generador-1' (sin cruzarse entre ellas)
+  for i in range(proyeccion.index(hebra_a), 0, -1):
+    Cruce(i)
+  for i in range(proyeccion.index(hebra_b), 1, -1):
+    Cruce(i)
+  for i in range(2, generador + 1):
+    Cruce(i)
+  for i in range(1, generador):
+    Cruce(i)
+
+  # Creamos formalmente la trenza asociada (ya conocemos su permutación)
+  trenza_Cloak = Braid(gradoBn,
+                       ReduccionLibre(palabra_aleatoria + correccion))
+  trenza_Cloak.perm = Permutacion(proyeccion)
+
+  if (estadisticas is not None):
+    estadisticas["longitud_aleatoria"] = len(palabra_aleatoria)
+    estadisticas["longitud_correccion"] = len(correccion)
+    estadisticas["longitud_final"] = len(trenza_Cloak.elementos)
 
   return trenza_Cloak
 
@@ -98,6 +129,130 @@ def Cloaking_Element(permutacionM, t_values, generador, gradoBn):
 
     return Cloak_Element
 
+# Reserva de Cloak Elements generados en segundo plano. Los elementos se
+# agrupan por clave (permutacionM, t_unos, generador) y un hilo mantiene cada
+# reserva llena: cuando una baja a 'marca_baja' elementos se rellena hasta
+# 'profundidad'. Como mucho se guardan 'max_claves' reservas (se descarta la
+# usada hace más tiempo), así que la memoria queda acotada por
+# max_claves * profundidad Cloak Elements
+class CloakPool:
+
+  # Constructor (arranca el hilo que rellena las reservas)
+  def __init__(self, gradoBn, profundidad = 4, marca_baja = 1, max_claves = 8):
+
+    self.gradoBn = gradoBn
+    self.profundidad = profundidad
+    self.marca_baja = marca_baja
+    self.max_claves = max_claves
+
+    self.reservas = OrderedDict()    # Clave --> Cloak Elements listos
+    self.pendientes = OrderedDict()  # Clave --> t_values (reservas a rellenar)
+    self.en_curso = 0                # Cloak Elements generándose
+    self.condicion = threading.Condition()
+    self.activo = True
+    self.estadisticas = {"aciertos": 0, "fallos": 0, "generados": 0}
+
+    self.hilo = threading.Thread(target=self.Rellenar, daemon=True)
+    self.hilo.start()
+
+  # Clave de la reserva (None si los t_values no tienen t_unos válidos)
+  def Clave(self, permutacionM, t_values, generador):
+
+    t_unos = Comprobador_cloak_t_unos(t_values, self.gradoBn)
+    if (t_unos == None):
+      return None
+    return (permutacionM, tuple(t_unos), generador)
+
+  # Reserva de una clave (se crea si no existe, descartando la usada hace más
+  # tiempo si se supera 'max_claves'). Se llama con la condición adquirida
+  def Reserva(self, clave):
+
+    if (clave in self.reservas):
+      self.reservas.move_to_end(clave)
+    else:
+      self.reservas[clave] = deque()
+      if (len(self.reservas) > self.max_claves):
+        descartada, _ = self.reservas.popitem(last=False)
+        self.pendientes.pop(descartada, None)
+    return self.reservas[clave]
+
+  # Da de alta una clave para que se vaya llenando su reserva
+  def Registrar(self, permutacionM, t_values, generador):
+
+    clave = self.Clave(permutacionM, t_values, generador)
+    if (clave == None):
+      return
+    with self.condicion:
+      if (len(self.Reserva(clave)) < self.profundidad):
+        self.pendientes[clave] = t_values
+        self.condicion.notify_all()
+
+  # Devuelve un Cloak Element para (permutacionM, t_values, generador). Si la
+  # reserva está vacía se genera en el momento (y se da de alta la clave)
+  def Obtener(self, permutacionM, t_values, generador):
+
+    clave = self.Clave(permutacionM, t_values, generador)
+    if (clave == None):
+      return None
+
+    with self.condicion:
+      reserva = self.Reserva(clave)
+      if (reserva):
+        Cloak_Element = reserva.popleft()
+        self.estadisticas["aciertos"] += 1
+      else:
+        Cloak_Element = None
+        self.estadisticas["fallos"] += 1
+      if (len(reserva) <= self.marca_baja):
+        self.pendientes[clave] = t_values
+        self.condicion.notify_all()
+
+    if (Cloak_Element == None):
+      Cloak_Element = Cloaking_Element(permutacionM, t_values, generador,
+                                       self.gradoBn)
+    return Cloak_Element
+
+  # Bucle del hilo: genera Cloak Elements para las reservas pendientes
+  def Rellenar(self):
+
+    while True:
+      with self.condicion:
+        while (self.activo and not self.pendientes):
+          self.condicion.wait()
+        if (not self.activo):
+          return
+        clave, t_values = self.pendientes.popitem(last=False)
+        self.en_curso += 1
+
+      # La generación se hace sin bloquear a quien esté firmando
+      Cloak_Element = Cloaking_Element(clave[0], t_values, clave[2],
+                                       self.gradoBn)
+
+      with self.condicion:
+        self.en_curso -= 1
+        reserva = self.reservas.get(clave)
+        if (reserva is not None):    # Puede haberse descartado entretanto
+          reserva.append(Cloak_Element)
+          self.estadisticas["generados"] += 1
+          if (len(reserva) < self.profundidad):
+            self.pendientes[clave] = t_values
+        self.condicion.notify_all()
+
+  # Espera a que todas las reservas estén llenas
+  def Esperar(self):
+
+    with self.condicion:
+      while (self.activo and (self.pendientes or self.en_curso)):
+        self.condicion.wait()
+
+  # Detiene el hilo
+  def Detener(self):
+
+    with self.condicion:
+      self.activo = False
+      self.condicion.notify_all()
+    self.hilo.join()
+
 if __name__ == "__main__":
 
   print("\nPRUEBA DE EJECUCIÓN DE 'Comprobador_cloak_t_unos':\n")
@@ -130,6 +285,10 @@ if __name__ == "__main__":
   print("\t r-1(t_unos[0]) = ", (permutacionM**(-1)).apply(t_unos[0]))
   print("\t r-1(t_unos[1]) = ", (permutacionM**(-1)).apply(t_unos[1]))
 
+  estadisticas = {}
+  Generador_trenza_cloak(generador, permutacionM, t_unos, 10, estadisticas)
+  print("Estadísticas de la construcción:", estadisticas)
+
 
   print("\nPRUEBA DE EJECUCIÓN DE 'Cloaking_Element':\n")
 
@@ -157,4 +316,18 @@ if __name__ == "__main__":
   E_mult_Cloaking_Element0 = E_Multiplicacion(M, permutacionM,
     Cloak_Element.elementos, gradoBn, gradoCF, t_values, eval)
   print("\nE-Multiplicación para M y permM por Cloak-Element:\n", np.array(E_mult_Cloaking_Element0[0]))
-  print("\nPermutación final:", E_mult_Cloaking_Element0[1], "\n")
\ No newline at end of file
+  print("\nPermutación final:", E_mult_Cloaking_Element0[1], "\n")
+
+
+  print("\nPRUEBA DE EJECUCIÓN DE 'CloakPool':\n")
+
+  pool = CloakPool(gradoBn, profundidad = 3)
+  pool.Registrar(permutacionM, eval, 3)
+  pool.Esperar()
+  for _ in range(4):
+    Cloak_Element = pool.Obtener(permutacionM, eval, 3)
+    print("Longitud Cloak Element obtenido de la reserva:",
+          len(Cloak_Element.elementos))
+  pool.Esperar()
+  pool.Detener()
+  print("Estadísticas de la reserva:", pool.estadisticas, "\n")
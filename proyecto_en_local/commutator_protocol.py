@@ -1,5 +1,5 @@
 
-from braid import *
+from garside import *
 import random
 
 def GeneradorSecretoProtocolo(generadores_subgrupo, longitud_max, permiteInv):
@@ -120,5 +120,11 @@ if __name__ == "__main__":
   print("Secreto compartido computado por parte A:", Secreto_Compartido_A.elementos)
   print("Secreto compartido computado por parte B:", Secreto_Compartido_B.elementos)
 
+  # Comprobación rápida (probabilística) con las huellas de Burau coloreada
+  print("¿Coinciden las huellas de ambos secretos compartidos?:",
+        Secreto_Compartido_A.Huella() == Secreto_Compartido_B.Huella())
+
+  # Las palabras pueden ser distintas aun representando la misma trenza, por lo
+  # que se comparan sus formas normales de Garside
   print("¿Han llegado ambas partes al mismo secreto compartido?:",
-        Secreto_Compartido_A.elementos == Secreto_Compartido_B.elementos, "\n")
+        TrenzasIguales(Secreto_Compartido_A, Secreto_Compartido_B), "\n")
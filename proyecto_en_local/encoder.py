@@ -1,7 +1,10 @@
 
 from braid import *
+from E_Multiplication import *
 import random
 import hashlib
+import mmap
+import os
 
 def mensaje_a_binario(mensaje):
     # Convertir el mensaje en una cadena de bytes (usando UTF-8)
@@ -36,6 +39,59 @@ def SHA256(mensaje):
   return hash_bin, cuartetos
 
 
+# Tamaño de los bloques en los que se lee un archivo para calcular su Hash
+TAMANO_BLOQUE = 1 << 20
+
+# Objeto Hash del algoritmo elegido: "sha256" o "blake2b" (BLAKE2b truncado a
+# 256 bits, más rápido y con resumen del mismo tamaño)
+def ObjetoHash(algoritmo = "sha256"):
+
+  if (algoritmo == "sha256"):
+    return hashlib.sha256()
+  elif (algoritmo == "blake2b"):
+    return hashlib.blake2b(digest_size=32)
+  else:
+    raise ValueError("Algoritmo Hash no soportado: " + str(algoritmo))
+
+# Resumen Hash (bytes) de un mensaje
+def ResumenMensaje(mensaje, algoritmo = "sha256"):
+
+  objeto_hash = ObjetoHash(algoritmo)
+  objeto_hash.update(mensaje)
+  return objeto_hash.digest()
+
+# Resumen Hash (bytes) de un archivo sin cargarlo entero en memoria: se lee por
+# bloques de tamaño fijo sobre un mismo buffer o, con 'usar_mmap', se mapea en
+# memoria y se le pasa el mapa completo al Hash
+def ResumenArchivo(ruta, algoritmo = "sha256", tamano_bloque = TAMANO_BLOQUE,
+                   usar_mmap = False):
+
+  objeto_hash = ObjetoHash(algoritmo)
+
+  with open(ruta, 'rb') as archivo:
+    if (usar_mmap and os.fstat(archivo.fileno()).st_size > 0):
+      with mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+        objeto_hash.update(mapa)
+    else:
+      buffer = bytearray(tamano_bloque)
+      vista = memoryview(buffer)
+      leidos = archivo.readinto(buffer)
+      while (leidos):
+        objeto_hash.update(vista[:leidos])
+        leidos = archivo.readinto(buffer)
+
+  return objeto_hash.digest()
+
+# Resumen Hash (bytes) como cadena binaria organizada también en cuartetos
+# (mismo formato que la salida de SHA256)
+def BinarioResumen(digest):
+
+  hash_bin = ''.join(format(byte, '08b') for byte in digest)
+  cuartetos = [hash_bin[i:i+4] for i in range(0, len(hash_bin), 4)]
+
+  return hash_bin, cuartetos
+
+
 # Devuelve una lista con los gradoBn - 1 posibles generadores del subgrupo de
 # trenzas puras sobre el que trabajar
 def Encoder_gen_sub_pure(gradoBn):
@@ -77,35 +133,78 @@ def SubColeccion_Random(coleccion, n):
 
 
 
-# Codifica una cadena binaria (organizada en cuarteros) en una trenza pura a
-# partir de 4 generadores puros
+# Cuartetos (enteros de 0 a 15) de un resumen Hash leídos directamente de sus
+# bytes (primero los 4 bits altos de cada byte)
+def CuartetosDigest(digest):
+
+  octetos = np.frombuffer(digest, dtype=np.uint8)
+  return np.stack((octetos >> 4, octetos & 0xF), axis=1).ravel()
+
+# Cuartetos como enteros a partir del resumen Hash en cualquiera de sus formas:
+# bytes, cadena binaria o lista de cuartetos (cadenas de 4 bits o enteros)
+def Cuartetos(hash):
+
+  if (isinstance(hash, (bytes, bytearray, memoryview))):
+    return CuartetosDigest(hash).tolist()
+  if (isinstance(hash, str)):
+    hash = [hash[i:i+4] for i in range(0, len(hash), 4)]
+  return [int(c, 2) if isinstance(c, str) else int(c) for c in hash]
+
+# Palabras (ya reducidas) de las potencias 1 a 4 de los generadores de CN4:
+# potencias[generador][exponente - 1]
+@lru_cache(maxsize=None)
+def PotenciasCN4(CN4):
+
+  return tuple(tuple(tuple(ReduccionLibre(list(g) * exponente))
+                     for exponente in range(1, 5)) for g in CN4)
+
+# Generador de las letras de la palabra codificada (sin reducir). Cada
+# cuarteto b0b1b2b3 aporta el generador b2b3 de CN4 elevado a b0b1 + 1
+def LetrasEncoder(hash, CN4):
+
+  for cuarteto in Cuartetos(hash):
+    palabra = CN4[cuarteto & 3]
+    for _ in range((cuarteto >> 2) + 1):
+      yield from palabra
+
+# Codifica el resumen Hash (bytes, cadena binaria o lista de cuartetos) en una
+# trenza pura a partir de 4 generadores puros
+  # La palabra se escribe en un buffer de enteros de 8 bits reservado de
+  # antemano con su tamaño máximo, aplicando Reducción Libre a la vez (el
+  # propio buffer hace de pila)
 def Encoder_Bin_Pure(cuartetos, CN4, gradoBn):
 
-  palabra_final = []
+  cuartetos = Cuartetos(cuartetos)
+  potencias = PotenciasCN4(tuple(tuple(g) for g in CN4))
 
-  for cuarteto in cuartetos:
+  longitud_maxima = len(cuartetos) * max(len(p[3]) for p in potencias)
+  palabra_final = array('b', bytes(longitud_maxima))
+  cima = 0
 
-    # Determinamos el generador
-    generador = int(cuarteto[2])*2 + int(cuarteto[3])
+  for cuarteto in cuartetos:
 
-    # Determinamos el exponente
-    exponente = int(cuarteto[0])*2 + int(cuarteto[1]) + 1
+    # Generador (b2b3) elevado al exponente (b0b1 + 1)
+    for gen in potencias[cuarteto & 3][cuarteto >> 2]:
+      if (cima > 0 and palabra_final[cima - 1] == -gen):
+        cima -= 1
+      else:
+        palabra_final[cima] = gen
+        cima += 1
 
-    # Codificamos el cuarteto al grupo trenzado (añadiéndolo a la palabra)
-    for _ in range(exponente):
-      palabra_final = palabra_final + CN4[generador]
+  del palabra_final[cima:]
 
   # Creamos formalmente la trenza representada por la palabra final
-  trenza_final = Braid(gradoBn, ReduccionLibre(palabra_final))
+  trenza_final = Braid(gradoBn, palabra_final)
 
   return trenza_final
 
 # Aplica el procedimento completo de codificación WalnutDSA
   # (está la opción de pasar por parámetro CN4 los 4 generadores del grupo libre
   # de trenzas puras con el que codificar. Si no se elige aleatoriamente)
-def Encoder_WalnutDSA(mensaje, gradoBn, CN4 = []):
+  # (el algoritmo Hash puede ser "sha256" o "blake2b")
+def Encoder_WalnutDSA(mensaje, gradoBn, CN4 = [], algoritmo = "sha256"):
 
-  cuartetos = SHA256(mensaje)[1]     # Aplica función Hash al mensaje
+  digest = ResumenMensaje(mensaje, algoritmo)   # Aplica función Hash al mensaje
 
   # Posibles generadores del subgrupo CN4
   coleccion_generadores = Encoder_gen_sub_pure(gradoBn)
@@ -116,19 +215,14 @@ def Encoder_WalnutDSA(mensaje, gradoBn, CN4 = []):
 
 
   # Codifica el mensaje a una trenza pura
-  trenza_encoder = Encoder_Bin_Pure(cuartetos, CN4, gradoBn)
+  trenza_encoder = Encoder_Bin_Pure(digest, CN4, gradoBn)
 
   return trenza_encoder, CN4
 
 # Versión del encoder pasando por parámetro el resumen Hash directamente
+# (bytes, cadena binaria o lista de cuartetos)
 def Encoder_WalnutDSA_Hash(hash, gradoBn, CN4 = []):
 
-  # Organizamos la lista de bits en cuartetos
-  cuartetos = []
-  for i in range(0, len(hash), 4):
-      cuarteto = hash[i:i+4]
-      cuartetos.append(cuarteto)
-
   # Posibles generadores del subgrupo CN4
   coleccion_generadores = Encoder_gen_sub_pure(gradoBn)
 
@@ -137,10 +231,53 @@ def Encoder_WalnutDSA_Hash(hash, gradoBn, CN4 = []):
     CN4 = SubColeccion_Random(coleccion_generadores, 4)
 
   # Codifica el mensaje a una trenza pura
-  trenza_encoder = Encoder_Bin_Pure(cuartetos, CN4, gradoBn)
+  trenza_encoder = Encoder_Bin_Pure(hash, CN4, gradoBn)
 
   return trenza_encoder, CN4
 
+# Tabla de E-Imágenes de las potencias 1 a 4 de los generadores de CN4. Al ser
+# trenzas puras, su permutación es la identidad y P(g^k) = (P(g)[0]^k, id), por
+# lo que la tabla solo depende de (CN4, gradoBn, gradoCF, eval) y se calcula una
+# única vez. tabla[generador, exponente - 1] es la matriz de g_generador^exponente
+def TablaPotenciasCN4(CN4, gradoBn, gradoCF, eval):
+
+  return _TablaPotenciasCN4(tuple(tuple(g) for g in CN4), gradoBn, gradoCF,
+                            tuple(int(x) for x in eval))
+
+@lru_cache(maxsize=None)
+def _TablaPotenciasCN4(CN4, gradoBn, gradoCF, eval):
+
+  CF = ObtenerCampoFinito(gradoCF)
+  tabla = np.zeros((len(CN4), 4, gradoBn, gradoBn), dtype=CF.dtype)
+
+  for generador, palabra in enumerate(CN4):
+    PEg, permutacion = E_Multiplicacion_P(palabra, gradoBn, gradoCF, None, eval)
+    if (permutacion != Permutacion.Identidad(gradoBn)):
+      raise ValueError("Los generadores de CN4 deben ser trenzas puras")
+
+    tabla[generador, 0] = CF.Convertir(PEg)
+    for exponente in range(1, 4):
+      tabla[generador, exponente] = CF.MultiplyMatrix(
+        tabla[generador, exponente - 1], tabla[generador, 0])
+
+  tabla.flags.writeable = False
+
+  return tabla
+
+# Evalúa directamente P(E(H(m))) a partir del resumen Hash (bytes, cadena
+# binaria o lista de cuartetos) como producto de a lo sumo 64 matrices precalculadas, una
+# por cuarteto, sin construir ni E-Multiplicar la palabra codificada
+def E_Multiplicacion_P_Hash(hash, CN4, gradoBn, gradoCF, eval):
+
+  CF = ObtenerCampoFinito(gradoCF)
+  tabla = TablaPotenciasCN4(CN4, gradoBn, gradoCF, eval)
+
+  M = np.eye(gradoBn, dtype=CF.dtype)
+  for cuarteto in Cuartetos(hash):
+    M = CF.MultiplyMatrix(M, tabla[cuarteto & 3, cuarteto >> 2])
+
+  return (Matrix(M), Permutacion.Identidad(gradoBn))
+
 if __name__ == "__main__":
 
   # Prueba de función Hash
@@ -152,6 +289,18 @@ if __name__ == "__main__":
   print("Efectivamente, lo he esperado son 64 cuartertos de 4 bits (256 bits como\
   salida de SHA-256)")
 
+  # Prueba del Hash de un archivo por bloques y mapeado en memoria
+  print("\nPRUEBA DE EJECUCIÓN DE 'ResumenArchivo':\n")
+  ruta = os.path.abspath(__file__)
+  with open(ruta, 'rb') as archivo:
+    contenido = archivo.read()
+  print("Archivo:", ruta)
+  print("¿Coincide el Hash por bloques?",
+        ResumenArchivo(ruta, tamano_bloque = 4096) == ResumenMensaje(contenido))
+  print("¿Coincide el Hash con mmap?",
+        ResumenArchivo(ruta, usar_mmap = True) == ResumenMensaje(contenido))
+  print("BLAKE2b-256:", ResumenArchivo(ruta, "blake2b").hex())
+
   # Prueba generador colección de generadores
   print("\nPRUEBA DE EJECUCIÓN DE 'Encoder_gen_sub_pure':\n")
   gradoBn = 8
@@ -174,6 +323,8 @@ if __name__ == "__main__":
   print("Longitud palabra codificada:", len(trenza_encoder.elementos))
   print("Permutación proyectada por la trenza codificada:", trenza_encoder.perm)
   print("Grado del grupo trenzado al que pertenece:", trenza_encoder.grado)
+  print("¿Coincide con las letras del generador 'LetrasEncoder' reducidas?",
+        trenza_encoder.elementos == ReductorLibre(LetrasEncoder(cuartetos, CN4)).tolist())
 
   # Prueba del Encoder completo
   print("\nPRUEBA DE EJECUCIÓN DEL PROCEDIMIENTO DE EJEUCIÓN COMPLETO:\n")
@@ -185,4 +336,18 @@ if __name__ == "__main__":
   print(" Palabra codificada:", trenza_encoder.elementos)
   print(" Longitud de la palabra codificada:", len(trenza_encoder.elementos))
   print(" Permutación proyectada por la trenza codificada:", trenza_encoder.perm)
-  print(" Grado del grupo trenzado al que pertenece:", trenza_encoder.grado, "\n")
\ No newline at end of file
+  print(" Grado del grupo trenzado al que pertenece:", trenza_encoder.grado, "\n")
+
+  # Prueba de la evaluación directa de P(E(H(m)))
+  print("PRUEBA DE EJECUCIÓN DE 'E_Multiplicacion_P_Hash':\n")
+  gradoCF = 5
+  eval = np.array([6, 1, 1, 9, 19, 14, 29, 30])
+  trenza_encoder, CN4 = Encoder_WalnutDSA(mensaje, gradoBn)
+  PEHm = E_Multiplicacion_P(trenza_encoder.elementos, gradoBn, gradoCF, None,
+                            eval)
+  PEHm_tabla = E_Multiplicacion_P_Hash(SHA256(mensaje)[0], CN4, gradoBn,
+                                       gradoCF, eval)
+  print("P(E(H(m))) E-Multiplicando la palabra codificada:\n", np.array(PEHm[0]))
+  print("\nP(E(H(m))) a partir de la tabla de potencias de CN4:\n",
+        np.array(PEHm_tabla[0]))
+  print("\n¿Coinciden?", PEHm[0] == PEHm_tabla[0], "\n")
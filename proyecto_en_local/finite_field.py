@@ -9,10 +9,139 @@
 # implementa toda la estructura de campos finitos.
 
 from pyfinite import ffield
+from functools import lru_cache
 
 import numpy as np
 
 
+# Campo finito GF(2^gradoCF) basado en tablas de logaritmos/antilogaritmos, de
+# forma que todas las operaciones aceptan arrays de Numpy (a diferencia de los
+# métodos 'Multiply' y 'Divide' de pyfinite). Los elementos se identifican con
+# el mismo entero que en `FField`, pues las tablas se construyen a partir de él
+class CampoFinito:
+
+  # Constructor
+  def __init__(self, gradoCF):
+
+    # Las tablas tienen 2^gradoCF entradas y los elementos se guardan en 8 o
+    # 16 bits, así que solo se admiten grados de 1 a 16
+    if (not 1 <= gradoCF <= 16):
+      raise ValueError("Grado del campo finito no soportado: {} (debe estar "
+                       "entre 1 y 16)".format(gradoCF))
+
+    CF = ffield.FField(gradoCF)   # Mismo polinomio generador que pyfinite
+
+    self.gradoCF = gradoCF
+    self.orden = 2**gradoCF
+    self.dtype = np.uint8 if gradoCF <= 8 else np.uint16
+
+    # Buscamos un elemento primitivo (de orden 2^gradoCF - 1) del grupo
+    # multiplicativo, cuyas potencias recorren todos los elementos no nulos
+    for alpha in range(2, self.orden):
+      potencias = [1]
+      while len(potencias) < self.orden - 1:
+        siguiente = CF.Multiply(potencias[-1], alpha)
+        if siguiente == 1:
+          break
+        potencias.append(siguiente)
+      if len(potencias) == self.orden - 1:
+        break
+    else:
+      potencias = [1]   # GF(2): el único elemento no nulo es el 1
+
+    # Antilogaritmos duplicados para no reducir log(a) + log(b) módulo 2^q - 1
+    self.exp = np.array(potencias + potencias, dtype=self.dtype)
+    self.log = np.zeros(self.orden, dtype=np.int32)
+    self.log[self.exp[:self.orden - 1]] = np.arange(self.orden - 1)
+
+  # Convierte una matriz (SymPy, Numpy o listas) a array de elementos del campo
+  def Convertir(self, matriz):
+
+    return np.array(matriz).astype(np.int64).astype(self.dtype)
+
+  # Suma (y resta) elemento a elemento: XOR en característica 2
+  def Add(self, a, b):
+
+    return np.bitwise_xor(np.asarray(a, dtype=self.dtype),
+                          np.asarray(b, dtype=self.dtype))
+
+  def Subtract(self, a, b):
+
+    return self.Add(a, b)
+
+  # Producto elemento a elemento mediante las tablas log/antilog
+  def Multiply(self, a, b):
+
+    a = np.asarray(a, dtype=self.dtype)
+    b = np.asarray(b, dtype=self.dtype)
+    producto = self.exp[self.log[a] + self.log[b]]
+
+    return np.where((a == 0) | (b == 0), 0, producto).astype(self.dtype)
+
+  # Inverso elemento a elemento (el 0 no es invertible)
+  def Inverse(self, a):
+
+    a = np.asarray(a, dtype=self.dtype)
+    if np.any(a == 0):
+      raise ZeroDivisionError("El 0 no es invertible en el campo finito")
+
+    return self.exp[(self.orden - 1 - self.log[a]) % (self.orden - 1)]
+
+  # División elemento a elemento
+  def Divide(self, a, b):
+
+    return self.Multiply(a, self.Inverse(b))
+
+  # Producto de matrices sobre el campo. Admite lotes de matrices (K, n, m) con
+  # la misma semántica de difusión que 'np.matmul'
+  def MultiplyMatrix(self, matriz1, matriz2):
+
+    matriz1 = np.asarray(matriz1, dtype=self.dtype)
+    matriz2 = np.asarray(matriz2, dtype=self.dtype)
+
+    # Todos los productos a_ik * b_kj a la vez y suma (XOR) sobre k
+    productos = self.Multiply(matriz1[..., :, :, None], matriz2[..., None, :, :])
+
+    return np.bitwise_xor.reduce(productos, axis=-2)
+
+  # Inversa de una matriz cuadrada sobre el campo (Gauss-Jordan vectorizado por
+  # filas)
+  def InverseMatrix(self, matriz):
+
+    matriz = np.array(matriz, dtype=self.dtype)
+    n = matriz.shape[0]
+    ampliada = np.concatenate((matriz, np.eye(n, dtype=self.dtype)), axis=1)
+
+    for col in range(n):
+
+      # Buscamos un pivote no nulo en la columna actual
+      pivotes = np.nonzero(ampliada[col:, col])[0]
+      if len(pivotes) == 0:
+        raise ZeroDivisionError("La matriz no es invertible en el campo finito")
+      pivote = col + pivotes[0]
+      ampliada[[col, pivote]] = ampliada[[pivote, col]]
+
+      # Normalizamos la fila del pivote y anulamos el resto de la columna
+      ampliada[col] = self.Multiply(ampliada[col], self.Inverse(ampliada[col, col]))
+      factores = ampliada[:, col].copy()
+      factores[col] = 0
+      ampliada ^= self.Multiply(factores[:, None], ampliada[col][None, :])
+
+    return ampliada[:, n:]
+
+  # División de matrices: matriz1 * matriz2^(-1)
+  def DivideMatrix(self, matriz1, matriz2):
+
+    return self.MultiplyMatrix(matriz1, self.InverseMatrix(matriz2))
+
+# Devuelve el campo finito (con sus tablas) de grado 2^gradoCF, compartido por
+# todas las llamadas con el mismo grado
+@lru_cache(maxsize=None)
+def ObtenerCampoFinito(gradoCF):
+
+  return CampoFinito(gradoCF)
+
+
 if __name__ == "__main__":
 
   # Creamos el campo finito de 32 elementos (2^5)
@@ -72,4 +201,14 @@ if __name__ == "__main__":
   print("\nResta de vectores en F32:\n", v_sub)
 
   print("\nLos métodos 'Multiply' y 'Divide' no soportan la entrada de \
-vectores/matrices como parámetros.\n\n")
\ No newline at end of file
+vectores/matrices como parámetros.\n\n")
+
+  print("LAS TABLAS DE 'CampoFinito' EXTIENDEN TODAS LAS OPERACIONES A ARRAYS:\n")
+
+  CF32 = ObtenerCampoFinito(5)
+  print("Producto elemento a elemento de M1 y M2 en F32:\n",
+        CF32.Multiply(m1, m2))
+  print("\nProducto matricial de M1 y M2 en F32:\n", CF32.MultiplyMatrix(m1, m2))
+  print("\nInversa de M1 en F32:\n", CF32.InverseMatrix(m1))
+  print("\nM1 * M1^(-1) en F32:\n",
+        CF32.MultiplyMatrix(m1, CF32.InverseMatrix(m1)), "\n")
@@ -0,0 +1,287 @@
+# FORMA NORMAL DE GARSIDE (A IZQUIERDA)
+
+from braid import *
+from functools import lru_cache
+import random
+
+# Las trenzas simples (trenzas de permutación) del grupo trenzado n-ésimo se
+# representan por su proyección sobre Sn, como tupla de posiciones (con el
+# mismo convenio que ProyectarSn). Toda trenza se escribe de forma única como
+# Δ^inf·A1···Ak, con A1 != Δ, Ak != e y cada par (Ai, Ai+1) ponderado a
+# izquierda, es decir, S(Ai+1) ⊆ F(Ai) (descensos a izquierda de Ai+1 contenidos
+# en los descensos a derecha de Ai)
+
+# Automorfismo τ(A) = ΔAΔ^(-1) sobre un simple (τ(σi) = σn-i)
+def Tau(simple):
+
+  n = len(simple)
+  return tuple(n - 1 - simple[n - 1 - p] for p in range(n))
+
+# Conjunto de descenso a derecha F(A) = {i : A = A'σi}, como máscara de bits
+def DescensoDerecha(simple):
+
+  mascara = 0
+  for i in range(1, len(simple)):
+    if simple[i - 1] > simple[i]:
+      mascara |= 1 << i
+  return mascara
+
+# Conjunto de descenso a izquierda S(A) = {i : A = σiA'}, como máscara de bits
+def DescensoIzquierda(simple):
+
+  inversa = [0] * len(simple)
+  for p, hebra in enumerate(simple):
+    inversa[hebra] = p
+  return DescensoDerecha(inversa)
+
+# Tabla de simples del grupo trenzado n-ésimo. Cada simple que aparece recibe
+# un índice y se guardan sus descensos, su τ y sus productos Aσi y σi^(-1)A,
+# de modo que ponderar a izquierda solo consulta la tabla. Hay n! simples, así
+# que se van añadiendo a medida que se usan (con n = 8 caben todos, pero no
+# con los grados mayores de WalnutDSA)
+class TablaSimples:
+
+  # Constructor (con Δ, la identidad, los σi y los Δσi^(-1) ya indexados)
+  def __init__(self, n):
+
+    self.n = n
+    self.simples = []        # Índice --> simple (tupla de posiciones)
+    self.indices = {}        # Simple --> índice
+    self.derecha = []        # Descensos a derecha F(A)
+    self.izquierda = []      # Descensos a izquierda S(A)
+    self.tau = []            # Índice de τ(A) (None si aún no se ha calculado)
+    self.por_sigma = []      # Índices de Aσi (None si aún no se han calculado)
+    self.sigma_inv_por = []  # Índices de σi^(-1)A (ídem)
+    self.ponderados = {}     # Par (a, b) --> par ponderado a izquierda
+
+    self.delta = self.Indice(tuple(range(n - 1, -1, -1)))
+    self.identidad = self.Indice(tuple(range(n)))
+    self.sigma = [None]              # Índice i --> σi
+    self.delta_sigma_inv = [None]    # Índice i --> Δσi^(-1)
+    for i in range(1, n):
+      simple = list(range(n))
+      simple[i - 1], simple[i] = simple[i], simple[i - 1]
+      self.sigma.append(self.Indice(tuple(simple)))
+      simple = list(self.simples[self.delta])
+      simple[i - 1], simple[i] = simple[i], simple[i - 1]
+      self.delta_sigma_inv.append(self.Indice(tuple(simple)))
+
+  # Índice de un simple (se añade a la tabla si no estaba)
+  def Indice(self, simple):
+
+    indice = self.indices.get(simple)
+    if indice is None:
+      indice = len(self.simples)
+      self.indices[simple] = indice
+      self.simples.append(simple)
+      self.derecha.append(DescensoDerecha(simple))
+      self.izquierda.append(DescensoIzquierda(simple))
+      self.tau.append(None)
+      self.por_sigma.append([None] * self.n)
+      self.sigma_inv_por.append([None] * self.n)
+    return indice
+
+  # Índice de τ(A)
+  def Tau(self, a):
+
+    if self.tau[a] is None:
+      self.tau[a] = self.Indice(Tau(self.simples[a]))
+    return self.tau[a]
+
+  # Índice de Aσi (se intercambian las posiciones i-1 e i)
+  def PorSigma(self, a, i):
+
+    producto = self.por_sigma[a][i]
+    if producto is None:
+      simple = list(self.simples[a])
+      simple[i - 1], simple[i] = simple[i], simple[i - 1]
+      producto = self.por_sigma[a][i] = self.Indice(tuple(simple))
+    return producto
+
+  # Índice de σi^(-1)A (se intercambian las hebras i-1 e i)
+  def SigmaInvPor(self, a, i):
+
+    producto = self.sigma_inv_por[a][i]
+    if producto is None:
+      intercambio = {i - 1: i, i: i - 1}
+      simple = tuple(intercambio.get(hebra, hebra) for hebra in self.simples[a])
+      producto = self.sigma_inv_por[a][i] = self.Indice(simple)
+    return producto
+
+  # Pondera a izquierda el par de simples (a, b): mientras haya un i en S(b)
+  # que no esté en F(a) se pasa el cruce σi de b a a (a <- aσi,
+  # b <- σi^(-1)b). Devuelve el nuevo par, que se guarda porque en la práctica
+  # los mismos pares se repiten una y otra vez
+  def Ponderar(self, a, b):
+
+    par = self.ponderados.get((a, b))
+    if par is None:
+      derecha, izquierda = self.derecha, self.izquierda
+      a_nuevo, b_nuevo = a, b
+      pendientes = izquierda[b_nuevo] & ~derecha[a_nuevo]
+      while pendientes:
+        i = (pendientes & -pendientes).bit_length() - 1
+        a_nuevo = self.PorSigma(a_nuevo, i)
+        b_nuevo = self.SigmaInvPor(b_nuevo, i)
+        pendientes = izquierda[b_nuevo] & ~derecha[a_nuevo]
+      par = self.ponderados[(a, b)] = (a_nuevo, b_nuevo)
+    return par
+
+# Tabla de simples del grupo trenzado n-ésimo (una por n)
+@lru_cache(maxsize=None)
+def TablasGarside(n):
+
+  return TablaSimples(n)
+
+# Calcula la forma normal a izquierda de la trenza representada por 'palabra'
+# en el grupo trenzado de grado 'grado'. Devuelve (inf, factores), con los
+# factores simples como tuplas de posiciones
+def FormaNormalIzquierda(palabra, grado):
+
+  n = max([grado, 2] + [abs(gen) + 1 for gen in palabra])
+  tabla = TablasGarside(n)
+
+  # La forma normal se construye leyendo la palabra de izquierda a derecha.
+  # Cuando un factor pasa a ser Δ se lleva directamente al principio
+  # (AΔ = Δτ(A)) y un σi^(-1) se escribe como Δ^(-1)·Δσi^(-1), llevando también
+  # el Δ^(-1) al principio. En ambos casos los factores a su izquierda quedan
+  # pendientes de aplicarles τ, lo que se anota en marcas[i] (τ sobre los
+  # factores de índice < i) y en giro_final (τ sobre todos). Así, cada factor
+  # se guarda como τ^p(Ai), con p la paridad de las marcas a su derecha
+  delta = tabla.delta
+  inf = 0
+  factores = []
+  marcas = []
+  giro_final = 0
+  for gen in palabra:
+
+    if gen < 0:
+      # Si el último factor acaba en σi basta con quitarle ese cruce (sus
+      # descensos a izquierda no crecen, sigue ponderado)
+      i = -gen
+      if factores:
+        ultimo = tabla.Tau(factores[-1]) if giro_final else factores[-1]
+        if tabla.derecha[ultimo] >> i & 1:
+          ultimo = tabla.PorSigma(ultimo, i)
+          if ultimo == tabla.identidad:
+            factores.pop()
+            giro_final ^= marcas.pop()
+          else:
+            factores[-1] = tabla.Tau(ultimo) if giro_final else ultimo
+          continue
+      inf -= 1
+      giro_final ^= 1
+      simple = tabla.delta_sigma_inv[i]
+    else:
+      simple = tabla.sigma[gen]
+
+    if simple == delta:          # Solo con n = 2
+      inf += 1
+      giro_final ^= 1
+      continue
+    factores.append(simple)
+    marcas.append(giro_final)
+    giro_final = 0
+
+    # Se pondera a izquierda de derecha a izquierda hasta que un par no
+    # cambie (lo anterior ya está ponderado)
+    paridad_b = 0
+    j = len(factores) - 2
+    while j >= 0:
+      paridad_a = paridad_b ^ marcas[j + 1]
+      a = tabla.Tau(factores[j]) if paridad_a else factores[j]
+      b = tabla.Tau(factores[j + 1]) if paridad_b else factores[j + 1]
+      a_nuevo, b_nuevo = tabla.Ponderar(a, b)
+      if b_nuevo == b:
+        break
+      factores[j + 1] = tabla.Tau(b_nuevo) if paridad_b else b_nuevo
+      if a_nuevo == delta:
+        inf += 1
+        del factores[j]
+        marca = marcas.pop(j)
+        marcas[j] ^= marca ^ 1     # El factor que pasa al índice j la hereda
+      else:
+        factores[j] = tabla.Tau(a_nuevo) if paridad_a else a_nuevo
+        paridad_b = paridad_a
+      j -= 1
+
+  # Se aplican los τ pendientes y se quitan las identidades (quedan al final)
+  paridad = giro_final
+  for i in range(len(factores) - 1, -1, -1):
+    if paridad:
+      factores[i] = tabla.Tau(factores[i])
+    paridad ^= marcas[i]
+  while factores and factores[-1] == tabla.identidad:
+    factores.pop()
+
+  return inf, tuple(tabla.simples[factor] for factor in factores)
+
+# Forma normal a izquierda de una trenza (objeto Braid)
+def FormaNormalTrenza(trenza):
+
+  return FormaNormalIzquierda(trenza.elementos, trenza.grado)
+
+# Palabra positiva (de longitud mínima) de un simple, ordenando por burbuja:
+# si Aσj1···σjk = e, entonces A = σjk···σj1
+@lru_cache(maxsize=None)
+def PalabraSimple(simple):
+
+  posiciones = list(simple)
+  cruces = []
+  for fin in range(len(posiciones) - 1, 0, -1):
+    for i in range(1, fin + 1):
+      if posiciones[i - 1] > posiciones[i]:
+        posiciones[i - 1], posiciones[i] = posiciones[i], posiciones[i - 1]
+        cruces.append(i)
+  cruces.reverse()
+
+  return cruces
+
+# Palabra que representa la forma normal Δ^inf·A1···Ak
+def PalabraFormaNormal(inf, factores, grado):
+
+  palabra_delta = Braid.TrenzaFundamental(grado)
+  if inf < 0:
+    palabra_delta = InverseWord(palabra_delta)
+  palabra = palabra_delta * abs(inf)
+  for factor in factores:
+    palabra += PalabraSimple(factor)
+
+  return ReduccionLibre(palabra)
+
+# Comprueba si dos trenzas son iguales comparando sus formas normales
+def TrenzasIguales(trenza1, trenza2):
+
+  grado = max(trenza1.grado, trenza2.grado)
+  return (FormaNormalIzquierda(trenza1.elementos, grado) ==
+          FormaNormalIzquierda(trenza2.elementos, grado))
+
+
+if __name__ == "__main__":
+
+  N = 5
+
+  print("\nFORMA NORMAL DE GARSIDE (A IZQUIERDA):\n")
+
+  delta = Braid(N, Braid.TrenzaFundamental(N))
+  print("Trenza fundamental:", delta.showBraid())
+  print("Forma normal:", FormaNormalTrenza(delta))
+
+  # Dos palabras distintas de la misma trenza (relaciones de trenza)
+  trenza1 = Braid(N, [1, 2, 1, 3, -1, 4])
+  trenza2 = Braid(N, [2, 1, 2, -1, 3, 4])
+  print("\nTrenza 1:", trenza1.showBraid())
+  print("Trenza 2:", trenza2.showBraid())
+  print("Forma normal de la trenza 1:", FormaNormalTrenza(trenza1))
+  print("Forma normal de la trenza 2:", FormaNormalTrenza(trenza2))
+  print("¿Son iguales?:", TrenzasIguales(trenza1, trenza2))
+
+  # Palabra aleatoria y su forma normal (reescrita como palabra)
+  palabra = [random.choice([-1, 1]) * random.randint(1, N - 1) for _ in range(30)]
+  inf, factores = FormaNormalIzquierda(palabra, N)
+  palabra_normal = PalabraFormaNormal(inf, factores, N)
+  print("\nPalabra aleatoria:", Braid(N, palabra).showBraid())
+  print("Forma normal: inf =", inf, "y", len(factores), "factores simples")
+  print("Palabra de la forma normal:", Braid(N, palabra_normal).showBraid())
+  print("¿Representan la misma trenza?:",
+        TrenzasIguales(Braid(N, palabra), Braid(N, palabra_normal)), "\n")
@@ -1,9 +1,141 @@
 
 from sympy.combinatorics import Permutation
+from functools import lru_cache
+from math import factorial
 
 import timeit
 import numpy as np
 
+# Permutación compacta respaldada por un array int8 de Numpy con la misma
+# semántica que `Permutation` de SymPy: 'array_form[i]' es la imagen de i y
+# p * q aplica primero p y luego q. Es inmutable, por lo que puede utilizarse
+# como clave de cachés (también a través de su índice de Lehmer)
+class Permutacion:
+
+  __slots__ = ("array_form",)
+
+  # Constructor (a partir de un array_form o de otra permutación)
+  def __init__(self, array_form):
+
+    array_form = getattr(array_form, "array_form", array_form)
+    self.array_form = np.array(array_form, dtype=np.int8)
+    self.array_form.flags.writeable = False
+
+  # Permutación identidad de n elementos
+  @classmethod
+  def Identidad(cls, n):
+
+    return cls(np.arange(n))
+
+  # Permutación de n elementos cuyo índice de Lehmer es 'indice'
+  @classmethod
+  def DesdeIndice(cls, indice, n):
+
+    restantes = list(range(n))
+    array_form = []
+    for i in range(n - 1, -1, -1):
+      posicion, indice = divmod(indice, factorial(i))
+      array_form.append(restantes.pop(posicion))
+
+    return cls(array_form)
+
+  @property
+  def size(self):
+
+    return len(self.array_form)
+
+  # Imagen de una posición
+  def apply(self, posicion):
+
+    return int(self.array_form[posicion])
+
+  # Composición por 'take' (se extiende con la identidad si difieren en tamaño)
+  def __mul__(self, otra):
+
+    a = self.array_form
+    b = np.asarray(getattr(otra, "array_form", otra), dtype=np.int8)
+    n = max(len(a), len(b))
+    if (len(a) < n):
+      a = np.concatenate((a, np.arange(len(a), n, dtype=np.int8)))
+    if (len(b) < n):
+      b = np.concatenate((b, np.arange(len(b), n, dtype=np.int8)))
+
+    return Permutacion(np.take(b, a))
+
+  # Potencias (la inversa se calcula por dispersión)
+  def __pow__(self, exponente):
+
+    if (exponente < 0):
+      inversa = np.empty_like(self.array_form)
+      inversa[self.array_form] = np.arange(self.size, dtype=np.int8)
+      return Permutacion(inversa) ** (-exponente)
+
+    resultado = Permutacion.Identidad(self.size)
+    for _ in range(exponente):
+      resultado = resultado * self
+
+    return resultado
+
+  # Composición con el generador (trasposición de |gen|-1 y |gen|) aplicado en
+  # primer lugar, es decir, ProyectarSn([gen]) * self
+  def AplicarGenerador(self, generador):
+
+    n = max(self.size, abs(generador) + 1)
+
+    return Permutacion(Trasposiciones(n)[abs(generador)]) * self
+
+  # Índice de Lehmer de la permutación (entre 0 y n! - 1)
+  def Indice(self):
+
+    a = self.array_form
+    n = self.size
+    return sum(int(np.count_nonzero(a[i+1:] < a[i])) * factorial(n - 1 - i)
+               for i in range(n))
+
+  def __eq__(self, otra):
+
+    b = getattr(otra, "array_form", None)
+    return b is not None and list(self.array_form) == list(b)
+
+  def __hash__(self):
+
+    return hash(self.array_form.tobytes())
+
+  # Notación cíclica (como SymPy, omitiendo los puntos fijos)
+  def __str__(self):
+
+    visitados = set()
+    ciclos = []
+    for i in range(self.size):
+      if i in visitados or self.array_form[i] == i:
+        continue
+      ciclo = [i]
+      visitados.add(i)
+      j = int(self.array_form[i])
+      while j != i:
+        ciclo.append(j)
+        visitados.add(j)
+        j = int(self.array_form[j])
+      ciclos.append("(" + " ".join(str(x) for x in ciclo) + ")")
+
+    return "".join(ciclos) if ciclos else "()"
+
+  def __repr__(self):
+
+    return "Permutacion(%s)" % self.array_form.tolist()
+
+# Tabla (n, n) con los array_forms de las trasposiciones adyacentes asociadas a
+# cada generador: la fila g es (g-1 g) y la fila 0 la identidad
+@lru_cache(maxsize=None)
+def Trasposiciones(n):
+
+  tabla = np.tile(np.arange(n, dtype=np.int8), (n, 1))
+  for g in range(1, n):
+    tabla[g, g-1], tabla[g, g] = g, g-1
+  tabla.flags.writeable = False
+
+  return tabla
+
 # Función para aplicar la permutación a un conjunto
 def AplicarPermConj(permutacion, conjunto):
 
@@ -177,4 +309,14 @@ la siguiente sintaxis para el orden de aplicación ( perm_i * perm_j = perm_i(pe
     for i in range(len(conjunto)):
         perm_pos.append(AplicarPermPos(perm, i))
         print("Permutamos posiciones:", perm_pos)
-    print("\n")
\ No newline at end of file
+    print("\n")
+
+    print("EJEMPLOS CON LA PERMUTACIÓN COMPACTA 'Permutacion':\n")
+    perm_compacta = Permutacion(perm)
+    print("Permutación:", perm_compacta)
+    print("Inversa:", perm_compacta**(-1))
+    print("Composición con su inversa:", perm_compacta * perm_compacta**(-1))
+    print("Índice de Lehmer:", perm_compacta.Indice())
+    print("Permutación recuperada a partir del índice:",
+          Permutacion.DesdeIndice(perm_compacta.Indice(), perm_compacta.size))
+    print("Tras el generador 3:", perm_compacta.AplicarGenerador(3), "\n")
@@ -1,5 +1,9 @@
 
 from braid import *
+from garside import FormaNormalIzquierda
+from functools import lru_cache
+from itertools import chain
+import numpy as np
 import random
 
 # Función que comprueba si el vector "particiones" define una partición válida
@@ -25,249 +29,132 @@ def GeneradorSecuenciaRParticion(particion):
 
   return R
 
-# Función auxiliar para RewriteSubW - Caso Correspondencia 1
-    # pasamos la correspondencia como una lista 'correspondencia_l' para simular
-    # el paso por valor en python (correspondencia = correspondencia_l[0])
-def RewriteSubW_C1(w, R, correspondencia_l):
-
-  correspondencia_detectada = False
-
-  if ( (R[0] <= w[1]) and (w[1] < w[0]) and (w[0] < R[1]) ):    # y_jy_i
-    correspondencia_l[0][0] = w[1]         # y_i
-    correspondencia_l[0][1] = w[0] - 1     # y_{j-1}
-    correspondencia_l[0][2] = -(R[1] - 1)  # r_{u+1}-1^{-1}
-    correspondencia_detectada = True
-
-  elif ( (R[1] <= w[1]) and (w[1] < w[0]) and (w[0] < R[2]) ):  # y_jy_i
-    correspondencia_l[0][0] = w[1]         # y_i
-    correspondencia_l[0][1] = w[0] - 1     # y_{j-1}
-    correspondencia_l[0][2] = -(R[2] - 1)  # r_{u+1}-1^{-1}
-    correspondencia_detectada = True
-
-  return correspondencia_detectada
-
-# Función auxiliar para RewriteSubW - Caso Correspondencia 2
-def RewriteSubW_C2(w, R, correspondencia_l):
-
-  correspondencia_detectada = False
-
-  if ( (R[0] <= w[0]) and (w[0] < w[1]+1) and (w[1]+1 < R[1]) ): # y_iy_{j-1}
-    correspondencia_l[0][0] = w[1] + 1     # y_j
-    correspondencia_l[0][1] = w[0]         # y_i
-    correspondencia_l[0][2] = (R[1] - 1)   # r_{u+1}-1
-    correspondencia_detectada = True
-
-  elif ( (R[1] <= w[0]) and (w[0] < w[1]+1) and (w[1]+1 < R[2]) ):# y_iy_{j-1}
-    correspondencia_l[0][0] = w[1] + 1     # y_j
-    correspondencia_l[0][1] = w[0]         # y_i
-    correspondencia_l[0][2] = (R[2] - 1)   # r_{u+1}-1
-    correspondencia_detectada = True
-
-  return correspondencia_detectada
-
-# Función auxiliar para RewriteSubW - Caso Correspondencia 3
-def RewriteSubW_C3(w, R, correspondencia_l):
-
-  correspondencia_detectada = False
-
-  if ( (-w[1] + 1 == R[1]) and (R[0] < w[0]+1) and (w[0]+1 < R[1]) ): # y_{j-1}y_{r_{μ+1}-1}^{-1}
-    i = random.randint(R[0], w[0])         # R[0] <= i < j
-    correspondencia_l[0][0] = -i           # y_i^{-1}
-    correspondencia_l[0][1] = w[0] + 1     # y_j
-    correspondencia_l[0][2] = i            # y_i
-    correspondencia_detectada = True
-
-  elif ( (-w[1] + 1 == R[2]) and (R[1] < w[0]+1) and (w[0]+1 < R[2]) ): # y_{j-1}y_{r_{μ+1}-1}^{-1}
-    i = random.randint(R[1], w[0])         # R[1] <= i < j
-    correspondencia_l[0][0] = -i           # y_i^{-1}
-    correspondencia_l[0][1] = w[0] + 1     # y_j
-    correspondencia_l[0][2] = i            # y_i
-    correspondencia_detectada = True
-
-  return correspondencia_detectada
-
-# Función auxiliar para RewriteSubW - Caso Correspondencia 4
-def RewriteSubW_C4(w, R, correspondencia_l):
-
-  correspondencia_detectada = False
-
-  if ( (w[1] + 1 == R[1]) and (R[0] <= w[0]) and (w[0] < R[1] - 1) ): # y_iy_{r_{μ+1}-1}
-    j = random.randint(w[0] + 1, R[1] - 1) # i < j < R[1]
-    correspondencia_l[0][0] = -j           # y_j^{-1}
-    correspondencia_l[0][1] = w[0]         # y_i
-    correspondencia_l[0][2] = j-1          # y_{j-1}
-    correspondencia_detectada = True
-
-  elif ( (w[1] + 1 == R[2]) and (R[1] <= w[0]) and (w[0] < R[2] - 1) ): # y_iy_{r_{μ+1}-1}
-    j = random.randint(w[0] + 1, R[2] - 1) # i < j < R[2]
-    correspondencia_l[0][0] = -j           # y_j^{-1}
-    correspondencia_l[0][1] = w[0]         # y_i
-    correspondencia_l[0][2] = j-1          # y_{j-1}
-    correspondencia_detectada = True
-
-  return correspondencia_detectada
-
-# Función auxiliar para RewriteSubW - Caso Correspondencia 5
-def RewriteSubW_C5(w, R, correspondencia_l):
-
-  correspondencia_detectada = False
-
-  if ( (R[0] <= -w[0]) and (-w[0] < w[1]) and (w[1] < R[1]) ):   # y_i^{-1}y_j
-    correspondencia_l[0][0] = w[1] - 1     # y_{j-1}
-    correspondencia_l[0][1] = -(R[1] - 1)  # y_{r_{μ+1}-1}^{-1}
-    correspondencia_l[0][2] = w[0]         # y_i^{-1}
-    correspondencia_detectada = True
-
-  elif ( (R[1] <= -w[0]) and (-w[0] < w[1]) and (w[1] < R[2]) ):   # y_i^{-1}y_j
-    correspondencia_l[0][0] = w[1] - 1     # y_{j-1}
-    correspondencia_l[0][1] = -(R[2] - 1)  # y_{r_{μ+1}-1}^{-1}
-    correspondencia_l[0][2] = w[0]         # y_i^{-1}
-    correspondencia_detectada = True
-
-  return correspondencia_detectada
-
-# Función auxiliar para RewriteSubW - Caso Correspondencia 6
-def RewriteSubW_C6(w, R, correspondencia_l):
-
-  correspondencia_detectada = False
-
-  if ( (R[0] <= w[1]) and (w[1] < -w[0]) and (-w[0] < R[1]) ):   # y_j^{-1}y_i
-    correspondencia_l[0][0] = w[1]         # y_i
-    correspondencia_l[0][1] = R[1] - 1     # y_{r_{μ+1}-1}
-    correspondencia_l[0][2] = w[0] + 1     # y_{j-1}^{-1}
-    correspondencia_detectada = True
-
-  elif ( (R[1] <= w[1]) and (w[1] < -w[0]) and (-w[0] < R[2]) ):   # y_j^{-1}y_i
-    correspondencia_l[0][0] = w[1]         # y_i
-    correspondencia_l[0][1] = R[2] - 1     # y_{r_{μ+1}-1}
-    correspondencia_l[0][2] = w[0] + 1     # y_{j-1}^{-1}
-    correspondencia_detectada = True
-
-  return correspondencia_detectada
-
-# Función auxiliar para RewriteSubW - Caso Correspondencia 7
-def RewriteSubW_C7(w, R, correspondencia_l):
-
-  correspondencia_detectada = False
-
-  if ( (R[1] == -w[0] + 1) and (R[0] <= -w[1]) and (-w[1] < R[1] - 1) ):   # y_{r_{μ+1}-1}^{-1}y_i^{-1}
-    j = random.randint(-w[1] + 1, R[1] - 1) # i < j < R[1]
-    correspondencia_l[0][0] = -(j-1)        # y_{j-1}^{-1}
-    correspondencia_l[0][1] = w[1]          # y_i^{-1}
-    correspondencia_l[0][2] = j             # y_j
-    correspondencia_detectada = True
-
-  elif ( (R[2] == -w[0] + 1) and (R[1] <= -w[1]) and (-w[1] < R[2] - 1) ):   # y_{r_{μ+1}-1}^{-1}y_i^{-1}
-    j = random.randint(-w[1] + 1, R[2] - 1) # i < j < R[2]
-    correspondencia_l[0][0] = -(j-1)        # y_{j-1}^{-1}
-    correspondencia_l[0][1] = w[1]          # y_i^{-1}
-    correspondencia_l[0][2] = j             # y_j
-    correspondencia_detectada = True
-
-  return correspondencia_detectada
-
-# Función auxiliar para RewriteSubW - Caso Correspondencia 8
-def RewriteSubW_C8(w, R, correspondencia_l):
-
-  correspondencia_detectada = False
-
-  if ( (R[1] == w[0] + 1) and (R[0] < -w[1]+1) and (-w[1]+1 < R[1]) ):   # y_{r_{μ+1}-1}y_{j-1}^{-1}
-    i = random.randint(R[0], -w[1])        # R[0] <= i < j
-    correspondencia_l[0][0] = -i           # y_i^{-1}
-    correspondencia_l[0][1] = w[1] - 1     # y_j^{-1}
-    correspondencia_l[0][2] = i            # y_i
-    correspondencia_detectada = True
-
-  elif ( (R[2] == w[0] + 1) and (R[1] < -w[1]+1) and (-w[1]+1 < R[2]) ):   # y_{r_{μ+1}-1}y_{j-1}^{-1}
-    i = random.randint(R[1], -w[1])        # R[1] <= i < j
-    correspondencia_l[0][0] = -i           # y_i^{-1}
-    correspondencia_l[0][1] = w[1] - 1     # y_j^{-1}
-    correspondencia_l[0][2] = i            # y_i
-    correspondencia_detectada = True
-
-  return correspondencia_detectada
-
-# Función auxiliar para RewriteSubW - Caso Correspondencia 9
-def RewriteSubW_C9(w, R, correspondencia_l):
-
-  correspondencia_detectada = False
-
-  if ( (R[0] <= -w[1]) and (-w[1] < -w[0]+1) and (-w[0]+1 < R[1]) ):   # y_{j-1}^{-1}y_i^{-1}
-    correspondencia_l[0][0] = -(R[1] - 1)  # y_{r_{μ+1}-1}^{-1}
-    correspondencia_l[0][1] = w[1]         # y_i^{-1}
-    correspondencia_l[0][2] = w[0] - 1     # y_j^{-1}
-    correspondencia_detectada = True
-
-  elif ( (R[1] <= -w[1]) and (-w[1] < -w[0]+1) and (-w[0]+1 < R[2]) ):   # y_{j-1}^{-1}y_i^{-1}
-    correspondencia_l[0][0] = -(R[2] - 1)  # y_{r_{μ+1}-1}^{-1}
-    correspondencia_l[0][1] = w[1]         # y_i^{-1}
-    correspondencia_l[0][2] = w[0] - 1     # y_j^{-1}
-    correspondencia_detectada = True
-
-  return correspondencia_detectada
-
-# Función auxiliar para RewriteSubW - Caso Correspondencia 10
-def RewriteSubW_C10(w, R, correspondencia_l):
-
-  correspondencia_detectada = False
-
-  if ( (R[0] <= -w[0]) and (-w[0] < -w[1]) and (-w[1] < R[1]) ):   # y_i^{-1}y_j^{-1}
-    correspondencia_l[0][0] = R[1] - 1     # y_{r_{μ+1}-1}
-    correspondencia_l[0][1] = w[1] + 1     # y_{j-1}^{-1}
-    correspondencia_l[0][2] = w[0]         # y_i^{-1}
-    correspondencia_detectada = True
+# Tipos de entrada de las tablas de reglas de SRel(P)
+SIN_REGLA = 0         # La 2-subpalabra se deja como está
+REGLA_FIJA = 1        # Correspondencia (v0, v1, v2)
+REGLA_ALEATORIA = 2   # Correspondencia (-x + v0, v1, x + v2), x en [x_min, x_max]
+
+# Regla de SRel(P) para la 2-subpalabra w = (w0, w1) de y-generadores del
+# bloque [r_u, r_{u+1}) = [lo, hi) de la partición. Devuelve la entrada
+# (tipo, v0, v1, v2, x_min, x_max) correspondiente de la tabla de reglas
+def EntradaReglaSRel(w0, w1, lo, hi):
+
+  # Correspondencia 1: y_jy_i --> y_i y_{j-1} y_{r_{u+1}-1}^{-1}
+  if (lo <= w1 < w0 < hi):
+    return (REGLA_FIJA, w1, w0 - 1, -(hi - 1), 0, 0)
+
+  # Correspondencia 2: y_iy_{j-1} --> y_j y_i y_{r_{u+1}-1}
+  if (lo <= w0 < w1 + 1 < hi):
+    return (REGLA_FIJA, w1 + 1, w0, hi - 1, 0, 0)
+
+  # Correspondencia 3: y_{j-1}y_{r_{u+1}-1}^{-1} --> y_i^{-1} y_j y_i,
+  # con r_u <= i < j
+  if (-w1 + 1 == hi and lo < w0 + 1 < hi):
+    return (REGLA_ALEATORIA, 0, w0 + 1, 0, lo, w0)
+
+  # Correspondencia 4: y_iy_{r_{u+1}-1} --> y_j^{-1} y_i y_{j-1},
+  # con i < j < r_{u+1}
+  if (w1 + 1 == hi and lo <= w0 < hi - 1):
+    return (REGLA_ALEATORIA, 0, w0, -1, w0 + 1, hi - 1)
+
+  # Correspondencia 5: y_i^{-1}y_j --> y_{j-1} y_{r_{u+1}-1}^{-1} y_i^{-1}
+  if (lo <= -w0 < w1 < hi):
+    return (REGLA_FIJA, w1 - 1, -(hi - 1), w0, 0, 0)
+
+  # Correspondencia 6: y_j^{-1}y_i --> y_i y_{r_{u+1}-1} y_{j-1}^{-1}
+  if (lo <= w1 < -w0 < hi):
+    return (REGLA_FIJA, w1, hi - 1, w0 + 1, 0, 0)
+
+  # Correspondencia 7: y_{r_{u+1}-1}^{-1}y_i^{-1} --> y_{j-1}^{-1} y_i^{-1} y_j,
+  # con i < j < r_{u+1}
+  if (hi == -w0 + 1 and lo <= -w1 < hi - 1):
+    return (REGLA_ALEATORIA, 1, w1, 0, -w1 + 1, hi - 1)
+
+  # Correspondencia 8: y_{r_{u+1}-1}y_{j-1}^{-1} --> y_i^{-1} y_j^{-1} y_i,
+  # con r_u <= i < j
+  if (hi == w0 + 1 and lo < -w1 + 1 < hi):
+    return (REGLA_ALEATORIA, 0, w1 - 1, 0, lo, -w1)
+
+  # Correspondencia 9: y_{j-1}^{-1}y_i^{-1} --> y_{r_{u+1}-1}^{-1} y_i^{-1} y_j^{-1}
+  if (lo <= -w1 < -w0 + 1 < hi):
+    return (REGLA_FIJA, -(hi - 1), w1, w0 - 1, 0, 0)
+
+  # Correspondencia 10: y_i^{-1}y_j^{-1} --> y_{r_{u+1}-1} y_{j-1}^{-1} y_i^{-1}
+  if (lo <= -w0 < -w1 < hi):
+    return (REGLA_FIJA, hi - 1, w1 + 1, w0, 0, 0)
+
+  return (SIN_REGLA, 0, 0, 0, 0, 0)
+
+# Tabla de reglas de SRel(P) de una partición (tupla), compilada una sola vez
+# por partición: array denso de forma (2n+1, 2n+1, 6), con n el número de
+# y-generadores, cuya entrada [w0 + n, w1 + n] es la de la 2-subpalabra
+# (w0, w1). Cada regla solo afecta a y-generadores de un mismo bloque, así que
+# a lo sumo un bloque da una entrada distinta de SIN_REGLA
+@lru_cache(maxsize=None)
+def TablaReglasSRel(particion):
+
+  R_particion = GeneradorSecuenciaRParticion(particion)
+  n = R_particion[-1] - 1
+  tabla = np.zeros((2*n + 1, 2*n + 1, 6), dtype=np.int16)
+
+  for w0 in range(-n, n + 1):
+    for w1 in range(-n, n + 1):
+      if (w0 == 0 or w1 == 0):
+        continue
+      for u in range(len(particion)):
+        entrada = EntradaReglaSRel(w0, w1, R_particion[u], R_particion[u + 1])
+        if (entrada[0] != SIN_REGLA):
+          tabla[w0 + n, w1 + n] = entrada
+          break
+
+  tabla.flags.writeable = False
+
+  return tabla
+
+# La misma tabla como listas anidadas de tuplas, para las consultas sueltas
+# desde Python: reglas[w0 + n][w1 + n]
+@lru_cache(maxsize=None)
+def ReglasSRel(particion):
+
+  return [[tuple(entrada) for entrada in fila]
+          for fila in TablaReglasSRel(particion).tolist()]
+
+# Correspondencia en SRel(P) de la 2-subpalabra (w0, w1) según las reglas
+# compiladas (la propia subpalabra si no hay ninguna aplicable)
+def CorrespondenciaSRel(w0, w1, reglas):
+
+  n = len(reglas) // 2
+  tipo, v0, v1, v2, x_min, x_max = reglas[w0 + n][w1 + n]
+
+  if (tipo == REGLA_FIJA):
+    return [v0, v1, v2]
+  elif (tipo == REGLA_ALEATORIA):
+    x = random.randint(x_min, x_max)
+    return [-x + v0, v1, x + v2]
+  else:
+    return [w0, w1]
 
-  elif ( (R[1] <= -w[0]) and (-w[0] < -w[1]) and (-w[1] < R[2]) ):   # y_i^{-1}y_j^{-1}
-    correspondencia_l[0][0] = R[2] - 1     # y_{r_{μ+1}-1}
-    correspondencia_l[0][1] = w[1] + 1     # y_{j-1}^{-1}
-    correspondencia_l[0][2] = w[0]         # y_i^{-1}
-    correspondencia_detectada = True
+# Partición asociada a una secuencia de R-valores
+def ParticionDeR(R_particion):
 
-  return correspondencia_detectada
+  return tuple(R_particion[i + 1] - R_particion[i]
+               for i in range(len(R_particion) - 1))
 
 # Devuelve la correspondiente 3-subpalabra para w y la R-Coleccion R
 def RewriteSubW(w, R):
 
-  correspondencia = [0, 0, 0]    # Correspondencia a devolver
-
   if (len(w) != 2):
     return w
 
-  # Correspondencia 1
-      # [correspondencia] para simular paso por valor
-  if (RewriteSubW_C1(w, R, [correspondencia])):
-    pass
-  # Correspondencia 2
-  elif (RewriteSubW_C2(w, R, [correspondencia])):
-    pass
-  # Correspondencia 3
-  elif (RewriteSubW_C3(w, R, [correspondencia])):
-    pass
-  # Correspondencia 4
-  elif (RewriteSubW_C4(w, R, [correspondencia])):
-    pass
-  # Correspondencia 5
-  elif (RewriteSubW_C5(w, R, [correspondencia])):
-    pass
-  # Correspondencia 6
-  elif (RewriteSubW_C6(w, R, [correspondencia])):
-    pass
-  # Correspondencia 7
-  elif (RewriteSubW_C7(w, R, [correspondencia])):
-    pass
-  # Correspondencia 8
-  elif (RewriteSubW_C8(w, R, [correspondencia])):
-    pass
-  # Correspondencia 9     # NO LA HE VISTO APLICAR EN WALNUT
-  elif (RewriteSubW_C9(w, R, [correspondencia])):
-    pass
-  # Correspondencia 10
-  elif (RewriteSubW_C10(w, R, [correspondencia])):
-    pass
-  else:
-    correspondencia = w
+  return CorrespondenciaSRel(w[0], w[1], ReglasSRel(ParticionDeR(R)))
 
-  return correspondencia
+# Reglas compiladas de SRel(P) de una partición (por defecto, la global)
+def ReglasParticion(particion_elegida = None):
+
+  if (particion_elegida is None):
+    particion_elegida = particion
+
+  return ReglasSRel(tuple(particion_elegida))
 
 # Devuelve la subpalabra tras aplicar conmutación 1 (bibj = bjbi |i-j| > 1)
 def RewriteConm1(w):
@@ -309,39 +196,133 @@ def RewriteConm2(w):
 
   return correspondencia
 
-# Expresa una palabra formada por generadores de Artin en el sistema yGen(P)
-def ArtinGenToYGen(w, ArtinGen_p):
+# Tabla plana de expansiones de letras: las palabras de todas las letras
+# g = ±1, ..., ±(N-1), directas e inversas, van seguidas en 'datos', y la de g
+# empieza en inicio[g + N - 1] y tiene longitud longitud[g + N - 1]
+class TablaExpansion:
 
-  w_yGenP = []     # Palabra expresada en el sistema yGen(P)
+  __slots__ = ("desplazamiento", "datos", "inicio", "longitud")
 
-  # Recorremos la palabra expresada en generadores de Artin
-  for i in w:
-    if (i > 0):
-      w_yGenP.extend(ArtinGen_p[i-1])
-    else:
-      w_yGenP.extend(InverseWord(ArtinGen_p[-i-1]))
+  # Constructor a partir de las palabras de las letras positivas 1, ..., N-1
+  def __init__(self, palabras):
 
-  w_yGenP = ReduccionLibre(w_yGenP)     # Reducimos antes de devolver
+    self.desplazamiento = len(palabras)
+    datos = []
+    inicio = [0] * (2*len(palabras) + 1)
+    longitud = [0] * (2*len(palabras) + 1)
 
-  return w_yGenP
+    for j, palabra in enumerate(palabras, 1):
+      for letra, expansion in ((j, palabra), (-j, InverseWord(palabra))):
+        inicio[letra + self.desplazamiento] = len(datos)
+        longitud[letra + self.desplazamiento] = len(expansion)
+        datos.extend(expansion)
 
-# Expresa una palabra formada por generadores de yGen(P) con generadores de
-# Artin
-def YGenToArtinGen(w, yGen_p):
+    self.datos = np.array(datos, dtype=np.int8)
+    self.inicio = np.array(inicio, dtype=np.int64)
+    self.longitud = np.array(longitud, dtype=np.int64)
 
-  w_ArtinGen = []    # Palabra expresada con generadores de Artin
+  # Palabra de la letra g
+  def Palabra(self, g):
 
-  # Recorremos la palabra expresada en el sistema yGen(P)
-  for i in w:
-    if (i > 0):
-      w_ArtinGen.extend(yGen_p[i-1])
-    else:
-      w_ArtinGen.extend(InverseWord(yGen_p[-i-1]))
+    k = g + self.desplazamiento
+    return self.datos[self.inicio[k]:self.inicio[k] + self.longitud[k]].tolist()
+
+  # Sustituye cada letra de 'palabra' por su expansión. La longitud del
+  # resultado se conoce de antemano, así que las expansiones se copian de la
+  # tabla directamente a un buffer de 8 bits reservado de una vez, y en ese
+  # mismo buffer se reduce libremente en una sola pasada
+  def Expandir(self, palabra):
+
+    indices = np.asarray(palabra, dtype=np.int64) + self.desplazamiento
+    longitudes = self.longitud[indices]
+    total = int(longitudes.sum())
+
+    # Posición en 'datos' de cada letra del resultado: inicio de la expansión
+    # de su letra original más su desplazamiento dentro de ella
+    finales = np.cumsum(longitudes)
+    posiciones = (np.repeat(self.inicio[indices] - (finales - longitudes),
+                            longitudes) + np.arange(total))
+
+    expandida = array('b', bytes(total))
+    vista = np.frombuffer(expandida, dtype=np.int8)
+    np.take(self.datos, posiciones, out=vista)
+    del vista         # Se libera el buffer antes de reducir
+
+    return ReduccionLibre(expandida)
+
+# Sistema de generadores yGen(P) del grupo trenzado N-ésimo asociado a una
+# partición P de N-1. Con r_u <= j < r_{u+1}, el j-ésimo y-generador es
+# y_j = b_j b_{j+1} ··· b_{r_{u+1}-1} y, recíprocamente, b_j = y_j y_{j+1}^{-1}
+# (b_j = y_j si j = r_{u+1}-1). Las palabras de ambas colecciones se guardan
+# en tablas de expansión planas
+class SistemaGenerador:
+
+  __slots__ = ("N", "particion", "R", "y_expansion", "b_expansion")
+
+  # Constructor
+  def __init__(self, N, particion):
+
+    self.N = N
+    self.particion = tuple(particion)
+    self.R = GeneradorSecuenciaRParticion(self.particion)
+
+    palabras_y = []
+    palabras_b = []
+    for u in range(len(self.particion)):
+      fin = self.R[u + 1]
+      for j in range(self.R[u], fin):
+        palabras_y.append(list(range(j, fin)))
+        palabras_b.append([j] if (j == fin - 1) else [j, -(j + 1)])
+
+    self.y_expansion = TablaExpansion(palabras_y)   # y-generador --> Artin
+    self.b_expansion = TablaExpansion(palabras_b)   # Artin --> yGen(P)
 
+  # Palabra (en generadores de Artin) del j-ésimo y-generador
+  def YGen(self, j):
 
-  w_ArtinGen = ReduccionLibre(w_ArtinGen)     # Reducimos antes de devolver
+    return self.y_expansion.Palabra(j)
 
-  return w_ArtinGen
+  # Palabra (en el sistema yGen(P)) del j-ésimo generador de Artin
+  def ArtinGen(self, j):
+
+    return self.b_expansion.Palabra(j)
+
+  # Colecciones de palabras de los y-generadores y de los generadores de
+  # Artin (en el formato de listas de listas de yGen_p y ArtinGen_p)
+  def PalabrasYGen(self):
+
+    return [self.YGen(j) for j in range(1, self.N)]
+
+  def PalabrasArtinGen(self):
+
+    return [self.ArtinGen(j) for j in range(1, self.N)]
+
+# Sistema yGen(P) para el grado N y la partición P de N-1, construido una sola
+# vez por cada par (N, P)
+@lru_cache(maxsize=None)
+def CompilarSistemaYGen(N, particion):
+
+  if (not ComprobadorParticion(N - 1, particion)):
+    raise ValueError("Partición {} de {} no válida".format(list(particion),
+                                                           N - 1))
+
+  return SistemaGenerador(N, particion)
+
+def SistemaYGen(N, particion):
+
+  return CompilarSistemaYGen(N, tuple(particion))
+
+# Expresa una palabra formada por generadores de Artin en el sistema yGen(P)
+# (ya reducida libremente)
+def ArtinGenToYGen(w, sistema):
+
+  return sistema.b_expansion.Expandir(w)
+
+# Expresa una palabra formada por generadores de yGen(P) con generadores de
+# Artin (ya reducida libremente)
+def YGenToArtinGen(w, sistema):
+
+  return sistema.y_expansion.Expandir(w)
 
 # Divide la palabra en bloques de longitud perteneciente al intervalo [a, b]
 def DivisionPalabraEnBloques(palabra, a, b):
@@ -359,7 +340,7 @@ def DivisionPalabraEnBloques(palabra, a, b):
 
   return bloques
 
-def AplicarSRelP(bloques, regla=0):
+def AplicarSRelP(bloques, regla=0, particion=None):
 
   nuevos_bloques = []   # Nueva lista de bloques para no sobreescribir
 
@@ -408,6 +389,7 @@ def AplicarSRelP(bloques, regla=0):
 
   # Se trata de SRel(P)
   else:
+    reglas = ReglasParticion(particion)
     # Recorremos los bloques
     for bloque in bloques:
       bloque_copy = bloque.copy()   # Copiamos bloques para no sobreescribir
@@ -416,7 +398,9 @@ def AplicarSRelP(bloques, regla=0):
 
       # Si ha tenido éxito la extracción
       if (subpalabra[1] != -1):
-        correspondencia = RewriteSubW(subpalabra[0], R) # Aplicamos SRel(P)
+        # Aplicamos SRel(P)
+        correspondencia = CorrespondenciaSRel(subpalabra[0][0],
+                                              subpalabra[0][1], reglas)
         # Eliminamos subpalabra extraída
         del bloque_copy[subpalabra[1]:subpalabra[1]+2]
 
@@ -449,66 +433,346 @@ def ExtraeSubPalabra(palabra, l):
 # posteriormente se trata de aplicar reducción libre
 def ConcatenarYRLibre(bloques_modificados):
 
-  # Concatenar bloques para formar nueva palabra
-  palabra_reescrita = []
-  [palabra_reescrita.extend(bloque) for bloque in bloques_modificados]
+  # Concatenar bloques para formar nueva palabra, aplicando Reducción Libre a
+  # medida que se añaden
+  reductor = ReductorLibre()
+  for bloque in bloques_modificados:
+    reductor.extend(bloque)
 
-  # Se trata de aplicar Reducción Libre
-  palabra_reescrita = ReduccionLibre(palabra_reescrita)
+  palabra_reescrita = reductor.tolist()
 
   return palabra_reescrita
 
-# Reescribe una palabra 'w' mediante el Algoritmo de Reescritura Estocástico
-# ocultando la palabra original
-def StochasticRewriting(w_ArtinGen, ArtinGen_p, yGen_p):
-
-  # Se expresa w en el sistema yGen(P)
-  w_yGen = ArtinGenToYGen(w_ArtinGen, ArtinGen_p)
-  w_final = w_yGen
-
-  # Repetimos el proceso lo suficiente para ocultar la palabra original
-  for i in range(3):
-
-    # Se divide en bloques
-    bloques_w_yGen = DivisionPalabraEnBloques(w_yGen, 5,10)
-
-    # Extrae una 2-subpalabra para cada bloque y la sustituye por su
-    # correspondencia en SRel(P), si es posible
-    bloques_SRelP = AplicarSRelP(bloques_w_yGen)
-
-    # Se concatenan los nuevos bloques y se trata de aplicar Reducción Libre a la
-    # nueva palabra
-    w_yGen = ConcatenarYRLibre(bloques_SRelP)
-
-  # Se expresa la palabra final en términos de generadores de Artin
-  w_ArtinGen = YGenToArtinGen(w_yGen, yGen_p)
-  w_ArtinGen = ReduccionLibre(w_ArtinGen)   # Reducimos palabra
-
-  # PRIMERA CONMUTACIÓN
-  for i in range(3):
-
-    bloques_w_ArtinGen = DivisionPalabraEnBloques(w_ArtinGen, 5,10)
-
-    # Extrae una 2-subpalabra para cada bloque y la trata de conmutar
-    bloques_Conm1 = AplicarSRelP(bloques_w_ArtinGen, 1)
-
-    # Se concatenan los nuevos bloques y se trata de aplicar Reducción Libre a la
-    # nueva palabra
-    w_ArtinGen = ConcatenarYRLibre(bloques_Conm1)
+# Elige de una vez los bloques de una pasada (longitudes aleatorias en [a,b],
+# el último posiblemente más corto) y, en cada bloque, la posición inicial
+# aleatoria de su l-subpalabra. Devuelve esas posiciones (absolutas en la
+# palabra y crecientes), omitiendo los bloques de longitud menor que l. El
+# generador de Numpy se siembra desde 'random', de modo que random.seed(...)
+# sigue haciendo reproducible toda la reescritura
+def PosicionesSubPalabras(longitud, a, b, l):
+
+  generador_aleatorio = np.random.default_rng(random.getrandbits(64))
+  longitudes = generador_aleatorio.integers(a, b + 1, size=longitud // a + 1)
+  finales = np.cumsum(longitudes)
+  num_bloques = int(np.searchsorted(finales, longitud)) + 1
+  finales = np.minimum(finales[:num_bloques], longitud)
+  inicios = np.concatenate(([0], finales[:-1]))
+  tamanos = finales - inicios
+
+  posiciones = inicios + (generador_aleatorio.random(num_bloques) *
+                          (tamanos - l + 1)).astype(np.int64)
+
+  return posiciones[tamanos >= l].tolist()
+
+# Aplica una pasada del Algoritmo de Reescritura Estocástico a 'palabra':
+# se divide en bloques de longitud en [a,b] y en cada bloque se sustituye una
+# subpalabra aleatoria por su correspondencia según la regla (0: SRel(P) sobre
+# 2-subpalabras, 1: conmutación 1 sobre 2-subpalabras, 2: conmutación 2 sobre
+# 3-subpalabras). El resultado se escribe en un único buffer de enteros de 8
+# bits, reservado de antemano, aplicando a la vez Reducción Libre (el propio
+# buffer hace de pila). SRel(P) se consulta en las reglas compiladas de la
+# partición, por defecto la global
+def PasadaReescritura(palabra, regla = 0, a = 5, b = 10, particion = None):
+
+  reglas = ReglasParticion(particion)
+  l = 3 if (regla == 2) else 2
+  posiciones = PosicionesSubPalabras(len(palabra), a, b, l)
+
+  # Trozos de la palabra nueva: tramos sin cambios y correspondencias
+  def Trozos():
+    anterior = 0
+    for pos in posiciones:
+      yield palabra[anterior:pos]
+      subpalabra = list(palabra[pos:pos + l])
+      if (regla == 1):
+        yield RewriteConm1(subpalabra)
+      elif (regla == 2):
+        yield RewriteConm2(subpalabra)
+      else:
+        yield CorrespondenciaSRel(subpalabra[0], subpalabra[1], reglas)
+      anterior = pos + l
+    yield palabra[anterior:]
+
+  # Cada correspondencia añade a lo sumo una letra
+  palabra_reescrita = array('b', bytes(len(palabra) + len(posiciones)))
+  cima = 0
+  for gen in chain.from_iterable(Trozos()):
+    if (cima > 0 and palabra_reescrita[cima - 1] == -gen):
+      cima -= 1
+    else:
+      palabra_reescrita[cima] = gen
+      cima += 1
+  del palabra_reescrita[cima:]
 
-  # SEGUNDA CONMUTACIÓN
-  for i in range(3):
+  return palabra_reescrita
 
-    bloques_w_ArtinGen = DivisionPalabraEnBloques(w_ArtinGen, 5,10)
+# Forma canónica de una ventana de generadores: las relaciones de trenza solo
+# dependen de si dos índices son iguales, contiguos o lejanos, así que los
+# índices que aparecen se renumeran desde 1 dejando un hueco cuando no son
+# contiguos. Devuelve la ventana renumerada y el índice original de cada nuevo
+def VentanaCanonica(ventana):
+
+  indices = sorted(set(abs(gen) for gen in ventana))
+  nuevo = {}
+  original = {}
+  actual = 0
+  for k, indice in enumerate(indices):
+    actual += 1 if (k > 0 and indice - indices[k - 1] == 1) else 2 - (k == 0)
+    nuevo[indice] = actual
+    original[actual] = indice
+
+  return (tuple(nuevo[gen] if gen > 0 else -nuevo[-gen] for gen in ventana),
+          original)
+
+# Palabra más corta equivalente a una ventana canónica (None si no la hay). Se
+# buscan palabras libremente reducidas en los mismos generadores (los
+# subgrupos parabólicos son convexos, una palabra más corta no necesita
+# otros) con la misma suma de exponentes y menor longitud, comparando formas
+# normales de Garside. Se guarda porque las mismas ventanas se repiten mucho
+@lru_cache(maxsize=None)
+def EquivalenteMasCorto(ventana):
+
+  grado = max(abs(gen) for gen in ventana) + 1
+  objetivo = FormaNormalIzquierda(ventana, grado)
+  suma = sum(1 if gen > 0 else -1 for gen in ventana)
+  letras = sorted(set(abs(gen) for gen in ventana))
+  letras = letras + [-gen for gen in letras]
+
+  # Longitudes candidatas, de menor a mayor, con la paridad de la suma
+  for longitud in range(abs(suma), len(ventana), 2):
+    candidatas = [()]
+    for _ in range(longitud):
+      candidatas = [palabra + (gen,) for palabra in candidatas for gen in letras
+                    if not (palabra and palabra[-1] == -gen)]
+    for palabra in candidatas:
+      if (sum(1 if gen > 0 else -1 for gen in palabra) == suma and
+          FormaNormalIzquierda(palabra, grado) == objetivo):
+        return palabra
+
+  return None
+
+# Pasada de mirilla para acortar una palabra sin cambiar la trenza. Las letras
+# se van apilando y cada letra nueva:
+#  - se cancela con un inverso suyo de la pila si entre ambos solo hay
+#    generadores lejanos (que conmutan con ella), mirando a lo sumo
+#    'profundidad' letras;
+#  - si no, se apila y las últimas 3..'ventana' letras de la pila se
+#    sustituyen por una palabra equivalente más corta, si la hay (lo que
+#    incluye pasos de longitud neutra como aba = bab seguidos de una
+#    cancelación). La sustitución se vuelve a procesar letra a letra.
+# Cada cambio acorta la palabra, así que la pasada termina. Si se pasa un
+# diccionario 'estadisticas' se anotan las cancelaciones y las sustituciones
+def ReduccionMirilla(palabra, ventana = 4, profundidad = 8, estadisticas = None):
+
+  pila = []
+  pendientes = list(reversed(palabra))   # Letras por procesar (en orden inverso)
+  cancelaciones = 0
+  sustituciones = 0
+
+  while pendientes:
+    gen = pendientes.pop()
+
+    # Cancelación a través de generadores lejanos
+    cancelada = False
+    for k in range(len(pila) - 1, max(len(pila) - 1 - profundidad, -1), -1):
+      letra = pila[k]
+      if (letra == -gen):
+        del pila[k]
+        cancelaciones += 1
+        cancelada = True
+        break
+      if (abs(abs(letra) - abs(gen)) <= 1 and letra != gen):
+        break
+    if cancelada:
+      continue
+
+    pila.append(gen)
+
+    # Sustitución de la cola de la pila por una equivalente más corta
+    for longitud in range(3, min(ventana, len(pila)) + 1):
+      canonica, original = VentanaCanonica(pila[-longitud:])
+      corta = EquivalenteMasCorto(canonica)
+      if (corta is not None):
+        del pila[-longitud:]
+        pendientes.extend(original[gen] if gen > 0 else -original[-gen]
+                          for gen in reversed(corta))
+        sustituciones += 1
+        break
+
+  if (estadisticas is not None):
+    estadisticas["cancelaciones"] = cancelaciones
+    estadisticas["sustituciones"] = sustituciones
+    estadisticas["longitud_inicial"] = len(palabra)
+    estadisticas["longitud_final"] = len(pila)
+
+  return pila
 
-    # Extrae una 3-subpalabra para cada bloque y la trata de conmutar
-    bloques_Conm2 = AplicarSRelP(bloques_w_ArtinGen, 2)
+# Reescribe una palabra 'w' mediante el Algoritmo de Reescritura Estocástico
+# ocultando la palabra original. 'sistema' es el sistema yGen(P) a emplear
+# (por defecto, el de B8 con la partición global).
+#
+# La mezcla mínima que se exige siempre es 'pasadas_minimas' (al menos 1)
+# pasadas de SRel(P) con bloques de longitud a lo sumo 'bloque_maximo' (en
+# cada bloque se reescribe a lo sumo una 2-subpalabra) y 'pasadas_conmutacion'
+# rondas de conmutaciones (una pasada de cada una, que no alargan la palabra).
+# Sin objetivo de longitud se aplica justo esa mezcla, con bloques de longitud
+# en [5, bloque_maximo].
+#
+# Con 'longitud_objetivo' (o 'factor_crecimiento' sobre la longitud original)
+# cada pasada de SRel(P) va seguida de una ronda de conmutaciones y se mide la
+# longitud resultante. Se adaptan:
+#  - la longitud de los bloques: las pasadas mínimas se reparten lo que falta
+#    para el objetivo, sin pasar nunca de 'bloque_maximo';
+#  - el número de pasadas: si falta longitud se añaden pasadas de SRel(P);
+#  - la mezcla de reglas: si sobra longitud se añaden rondas de conmutaciones,
+#    que mezclan sin alargar y, con la Reducción Libre, acortan algo la
+#    palabra (mientras sigan acortándola).
+# Se para al quedar a menos de 'tolerancia' (relativa) del objetivo o al
+# llegar a 'pasadas_maximas' pasadas o rondas extra. Si la mezcla mínima ya
+# supera el objetivo, o no se llega a él, se devuelve la palabra igualmente y
+# se indica en las estadísticas.
+#
+# Con 'mirilla' se acorta al final la palabra con una pasada de
+# ReduccionMirilla, que deshace buena parte del crecimiento de la reescritura
+# (la palabra puede quedar incluso más corta que la original), así que no se
+# admite junto con un objetivo de longitud. Si se pasa un diccionario
+# 'estadisticas' se anotan las longitudes inicial, objetivo y final, el factor
+# de expansión conseguido, los bloques de cada pasada de SRel(P), las rondas
+# de conmutaciones y, con objetivo, si se ha cumplido y la diferencia
+# (final - objetivo)
+def StochasticRewriting(w_ArtinGen, sistema = None, longitud_objetivo = None,
+                        factor_crecimiento = None, pasadas_minimas = 3,
+                        bloque_maximo = 10, pasadas_conmutacion = 3,
+                        pasadas_maximas = 20, tolerancia = 0.05,
+                        mirilla = False, estadisticas = None):
+
+  if (sistema is None):
+    sistema = SistemaYGen(8, particion)
+  if (pasadas_minimas < 1):
+    raise ValueError("pasadas_minimas debe ser al menos 1 (mezcla mínima): "
+                     "{}".format(pasadas_minimas))
+  if (bloque_maximo < 2):
+    raise ValueError("bloque_maximo debe ser al menos 2 (se reescriben "
+                     "2-subpalabras): {}".format(bloque_maximo))
+
+  longitud_inicial = len(w_ArtinGen)
+  if (longitud_objetivo is None and factor_crecimiento is not None):
+    longitud_objetivo = int(round(factor_crecimiento * longitud_inicial))
+  if (mirilla and longitud_objetivo is not None):
+    raise ValueError("La pasada de mirilla no se puede combinar con un "
+                     "objetivo de longitud (deshace el crecimiento)")
 
-    # Se concatenan los nuevos bloques y se trata de aplicar Reducción Libre a la
-    # nueva palabra
-    w_ArtinGen = ConcatenarYRLibre(bloques_Conm2)
+  # Se expresa w en el sistema yGen(P)
+  w_yGen = ArtinGenToYGen(w_ArtinGen, sistema)
+
+  # Repetimos el proceso lo suficiente para ocultar la palabra original: en
+  # cada pasada se divide en bloques, se sustituye una 2-subpalabra de cada
+  # bloque por su correspondencia en SRel(P), si es posible, y se aplica
+  # Reducción Libre
+  bloques = []
+  rondas = 0
+  if (longitud_objetivo is None):
+    a, b = min(5, bloque_maximo), bloque_maximo
+    for i in range(pasadas_minimas):
+      w_yGen = PasadaReescritura(w_yGen, 0, a, b, sistema.particion)
+      bloques.append((a, b))
+
+    # Se expresa la palabra final en términos de generadores de Artin (ya
+    # reducida)
+    w_ArtinGen = YGenToArtinGen(w_yGen, sistema)
 
-  w_final = ReduccionLibre(w_ArtinGen)   # Reducimos palabra
+  else:
+    # Letras de Artin que añade, en media, cada bloque de SRel(P) y fracción
+    # de la longitud que conserva una ronda de conmutaciones (solo pueden
+    # acortar la palabra). La tasa se estima acumulando letras añadidas y
+    # bloques de las pasadas anteriores (las más recientes pesan más), a
+    # partir de una estimación inicial de 1 letra por bloque con peso de 10
+    # bloques, para que las pasadas de pocos bloques no la desvíen
+    letras_acumuladas = bloques_acumulados = 10.0
+    tasa = 1.0
+    conservada = 1.0
+    longitud = longitud_inicial
+    rondas_extra = 0
+    while (len(bloques) < pasadas_maximas):
+      pendientes = pasadas_minimas - len(bloques)
+      restante = longitud_objetivo - longitud
+      if (pendientes <= 0 and abs(restante) <= tolerancia * longitud_objetivo):
+        break
+
+      # Sobra longitud tras la mezcla mínima: solo rondas de conmutaciones
+      if (pendientes <= 0 and restante < 0):
+        if (rondas_extra >= pasadas_maximas):
+          break
+        w_ArtinGen = PasadaReescritura(w_ArtinGen, 1, 5, 10)
+        w_ArtinGen = PasadaReescritura(w_ArtinGen, 2, 5, 10)
+        rondas += 1
+        rondas_extra += 1
+        longitud_previa, longitud = longitud, len(w_ArtinGen)
+        if (longitud > 0.995 * longitud_previa):
+          break                      # Ya apenas acortan
+        w_yGen = ArtinGenToYGen(w_ArtinGen, sistema)
+        continue
+
+      # Se apunta al 80% de lo que falta para acercarse al objetivo desde
+      # abajo (la tasa varía mucho de una pasada a otra). Los bloques nunca
+      # superan bloque_maximo, aunque eso haga pasarse del objetivo
+      restante = 0.8 * (longitud_objetivo / conservada - longitud)
+      num_bloques = max(restante, 0) / (tasa * max(pendientes, 1))
+      media = min(len(w_yGen) / max(num_bloques, 1), bloque_maximo)
+      a = max(2, int(media * 3 / 4))
+      b = max(min(int(round(media * 5 / 4)), bloque_maximo), a)
+      num_bloques = max(len(w_yGen) * 2 / (a + b), 1)
+
+      w_yGen = PasadaReescritura(w_yGen, 0, a, b, sistema.particion)
+      bloques.append((a, b))
+
+      # Ronda de conmutaciones sobre la palabra en generadores de Artin
+      w_ArtinGen = YGenToArtinGen(w_yGen, sistema)
+      letras_acumuladas = letras_acumuladas / 2 + len(w_ArtinGen) - longitud
+      bloques_acumulados = bloques_acumulados / 2 + num_bloques
+      tasa = max(letras_acumuladas / bloques_acumulados, 0.1)
+      longitud_previa = max(len(w_ArtinGen), 1)
+      w_ArtinGen = PasadaReescritura(w_ArtinGen, 1, 5, 10)
+      w_ArtinGen = PasadaReescritura(w_ArtinGen, 2, 5, 10)
+      conservada = max(len(w_ArtinGen) / longitud_previa, 0.5)
+      rondas += 1
+
+      longitud = len(w_ArtinGen)
+      w_yGen = ArtinGenToYGen(w_ArtinGen, sistema)
+
+    if (rondas == 0):
+      w_ArtinGen = YGenToArtinGen(w_yGen, sistema)
+
+  # Rondas de conmutaciones que falten hasta la mezcla mínima
+  for i in range(rondas, pasadas_conmutacion):
+    # PRIMERA CONMUTACIÓN (sobre 2-subpalabras)
+    w_ArtinGen = PasadaReescritura(w_ArtinGen, 1, 5, 10)
+  for i in range(rondas, pasadas_conmutacion):
+    # SEGUNDA CONMUTACIÓN (sobre 3-subpalabras)
+    w_ArtinGen = PasadaReescritura(w_ArtinGen, 2, 5, 10)
+  rondas = max(rondas, pasadas_conmutacion)
+
+  # Pasada de mirilla opcional
+  if mirilla:
+    w_ArtinGen = ReduccionMirilla(w_ArtinGen)
+
+  w_final = list(w_ArtinGen)
+
+  if (estadisticas is not None):
+    estadisticas["longitud_inicial"] = longitud_inicial
+    estadisticas["longitud_objetivo"] = longitud_objetivo
+    estadisticas["longitud_final"] = len(w_final)
+    estadisticas["factor_expansion"] = len(w_final) / max(longitud_inicial, 1)
+    estadisticas["bloques"] = bloques
+    estadisticas["rondas_conmutacion"] = rondas
+    if (longitud_objetivo is None):
+      estadisticas["objetivo_cumplido"] = None
+      estadisticas["diferencia_objetivo"] = None
+    else:
+      diferencia = len(w_final) - longitud_objetivo
+      estadisticas["objetivo_cumplido"] = (abs(diferencia) <=
+                                           tolerancia * longitud_objetivo)
+      estadisticas["diferencia_objetivo"] = diferencia
 
   return w_final
 
@@ -517,37 +781,6 @@ particion = [3,4]   # Partición a partir de la cual se genera el nuevo sistema
 R = GeneradorSecuenciaRParticion(particion)   # Secuencia de R-valores
 
 
-
-# Colección de palabras que representan los yGeneradores(P(8))
-y1_p = [1,2,3]
-y2_p = [2,3]
-y3_p = [3]
-y4_p = [4,5,6,7]
-y5_p = [5,6,7]
-y6_p = [6,7]
-y7_p = [7]
-yGen_p = [y1_p, y2_p, y3_p, y4_p, y5_p, y6_p, y7_p]
-
-# Colección de yGeneradores(P(8))
-y1 = Braid(8, yGen_p[0])
-y2 = Braid(8, yGen_p[1])
-y3 = Braid(8, yGen_p[2])
-y4 = Braid(8, yGen_p[3])
-y5 = Braid(8, yGen_p[4])
-y6 = Braid(8, yGen_p[5])
-y7 = Braid(8, yGen_p[6])
-yGen = [y1, y2, y3, y4, y5, y6, y7]
-
-# Generadores de Artin en función del nuevo sistema de generadores
-b1_yp = [1, -2]
-b2_yp = [2, -3]
-b3_yp = [3]
-b4_yp = [4, -5]
-b5_yp = [5, -6]
-b6_yp = [6, -7]
-b7_yp = [7]
-ArtinGen_p = [b1_yp, b2_yp, b3_yp, b4_yp, b5_yp, b6_yp, b7_yp]
-
 if __name__ == "__main__":
 
 
@@ -560,9 +793,14 @@ if __name__ == "__main__":
         R)
 
 
+  # Sistema yGen(P) de B8 para la partición elegida
+  sistema = SistemaYGen(8, particion)
+  yGen_p = sistema.PalabrasYGen()
+  ArtinGen_p = sistema.PalabrasArtinGen()
+
   print("\nColección de y-Generadores:")
   for i in range(7):
-    print("y{} = {}".format(i+1, yGen[i].showBraid()))
+    print("y{} = {}".format(i+1, Braid(8, yGen_p[i]).showBraid()))
 
 
   print("\nColección de generadores de Artin expresados en el nuevo sistema:")
@@ -575,26 +813,26 @@ if __name__ == "__main__":
   print("\nGenedores de Artin expresados en el sistema yGen(P)")
   for i in range(7):
     print("Generador de Artin {} --> Generadores yGen(P) {}".format(i+1,
-                                  ArtinGenToYGen([i+1], ArtinGen_p)))
+                                  ArtinGenToYGen([i+1], sistema).tolist()))
   w = [1,-2,7,4,5]
   print("\nPalabra en generadores de Artin:", w)
-  print("w expresada en el sistema yGen(P)", ArtinGenToYGen(w, ArtinGen_p))
+  print("w expresada en el sistema yGen(P)", ArtinGenToYGen(w, sistema).tolist())
 
   print("\n\nCONVERSIÓN: yGen(P) --> Generadores de Artin ")
   print("\nGenedores del sistema yGen(P) expresados con generadores de Artin")
   for i in range(7):
     print("Generador del sistema yGen(P)  {} --> Generadores de Artin {}".format(
-        i+1, YGenToArtinGen([i+1], yGen_p)))
+        i+1, YGenToArtinGen([i+1], sistema).tolist()))
   w = [-3,-2]
   print("\nPalabra expresada en el sistema yGen(P):", w)
-  print("w en generadores de Artin ", YGenToArtinGen(w, yGen_p))
+  print("w en generadores de Artin ", YGenToArtinGen(w, sistema).tolist())
 
   print("\nComprobamos que ambas funciones actúan como inversas recíprocamente,\
   (aplicando posteriormente reducción libre):")
   print("Artin --> YGen(P) --> Artin (R.Libre)   -->",
-        ReduccionLibre(ArtinGenToYGen(YGenToArtinGen(w, yGen_p), ArtinGen_p)))
+        ArtinGenToYGen(YGenToArtinGen(w, sistema), sistema).tolist())
   print("YGen(P) --> Artin --> YGen(P) (R.Libre) -->",
-        ReduccionLibre(YGenToArtinGen(ArtinGenToYGen(w, ArtinGen_p), yGen_p)))
+        YGenToArtinGen(ArtinGenToYGen(w, sistema), sistema).tolist())
 
   print("\nPRUEBA DE EJECUCIÓN DE LA DIVISIÓN EN BLOQUES:\n")
 
@@ -650,10 +888,18 @@ if __name__ == "__main__":
   reescrita:\n", palabra_reescrita)
 
   palabra = [7,-7,-6,-5]
-  palabray= ArtinGenToYGen(palabra, ArtinGen_p)
+  palabray= ArtinGenToYGen(palabra, sistema).tolist()
   print(palabray)
   RewriteSubW(palabray, R)
 
+  print("\nPRUEBA DE EJECUCIÓN DE UNA PASADA DE REESCRITURA:\n")
+
+  palabra_sin_dividir = list(range(7,0, -1)) + list(range(7, 0, -1))
+  print("Posiciones de las 2-subpalabras elegidas:",
+        PosicionesSubPalabras(len(palabra_sin_dividir), 5, 10, 2))
+  print("Palabra tras una pasada de SRel(P):",
+        PasadaReescritura(palabra_sin_dividir, 0).tolist())
+
   print("\nPRUEBA DE EJECUCIÓN DEL ALGORITMO DE REESCRITURA COMPLETO:\n")
 
   # Generaramos una palabra aleatoria de longitud 100
@@ -662,9 +908,34 @@ if __name__ == "__main__":
   palabra_original = [-1, -2, -1]
   print("Palabra original:", palabra_original)
   print("Longitud palabra original:", len(palabra_original))
-  palabra_reescrita = StochasticRewriting(palabra_original, ArtinGen_p, yGen_p)
+  palabra_reescrita = StochasticRewriting(palabra_original, sistema)
   print("Palabra reescrita por Algoritmo Estocástico:", palabra_reescrita)
   print("Longitud palabra reescrita:", len(palabra_reescrita))
 
   print("¿SE HA APLICADO ALGÚN CAMBIO?", palabra_original != palabra_reescrita, "\n")
 
+  print("PRUEBA DE EJECUCIÓN DE LA REESCRITURA CON OBJETIVO DE LONGITUD:\n")
+
+  palabra_original = ReduccionLibre([random.choice([-7, -6, -5, -4, -3, -2, -1,
+                                     1, 2, 3, 4, 5, 6, 7]) for _ in range(300)])
+  for factor in (None, 2, 3):
+    estadisticas = {}
+    palabra_reescrita = StochasticRewriting(palabra_original, sistema,
+                                            factor_crecimiento = factor,
+                                            estadisticas = estadisticas)
+    print("Factor objetivo:", factor, "--> longitud", len(palabra_original),
+          "-->", len(palabra_reescrita), "(factor de expansión {:.2f},".format(
+          estadisticas["factor_expansion"]), len(estadisticas["bloques"]),
+          "pasadas de SRel(P))")
+
+  print("\nPRUEBA DE EJECUCIÓN DE LA PASADA DE MIRILLA:\n")
+
+  print("Equivalente más corto de [1 2 1 -2]:", EquivalenteMasCorto((1, 2, 1, -2)))
+  estadisticas = {}
+  palabra_corta = ReduccionMirilla(palabra_reescrita, estadisticas = estadisticas)
+  print("Longitud de la palabra reescrita:", len(palabra_reescrita))
+  print("Longitud tras la pasada de mirilla:", len(palabra_corta))
+  print("Cancelaciones:", estadisticas["cancelaciones"], "- Sustituciones:",
+        estadisticas["sustituciones"])
+  print()
+
@@ -26,6 +26,10 @@ t_unos = Comprobador_cloak_t_unos(eval, N)  # posiciones en el vector
 a = t_unos[0] + 1                           # índices en los t_values
 b = t_unos[1] + 1
 
+# Generadores del subgrupo puro CN4 con el que se codifica el Hash (fijos y
+# públicos, lo que permite precalcular sus E-Imágenes en la verificación)
+CN4 = SubColeccion_Random(Encoder_gen_sub_pure(N), 4)
+
 # Clave privada
 w = Braid(N, ReduccionLibre(Palabra_aleatoria(N, 25, 50)))
 w_ = Braid(N, ReduccionLibre(Palabra_aleatoria(N, 25, 50)))
@@ -41,6 +45,7 @@ print("Algoritmo de reescritura: Algoritmo de estocásito de Kayawood")
 print("Grado del campo finito:", q)
 print("Índices de los t-valores con valor 1:", a, b)
 print("T-valores que definen la E-Multiplicación:", t_values)
+print("Generadores puros CN4 del codificador:", CN4)
 
 print("\nCLAVES DEL SISTEMA:\n")
 print("Palabra de la primera trenza de la clave privada:", w.showBraid())
@@ -53,6 +58,17 @@ pprint(Pw_[0])
 print("\n\nPermutación: ", Pw_[1])
 
 
+# RESERVA DE CLOAK ELEMENTS
+
+# Las permutaciones de los 3 Cloak Elements de cada firma (identidad, la de
+# P(w) y la de P(w')) son fijas para el par de claves, así que se generan en
+# segundo plano y la firma solo tiene que sacarlos de la reserva
+pool = CloakPool(N)
+for permutacion in (Permutacion.Identidad(N), Pw[1], Pw_[1]):
+  pool.Registrar(permutacion, eval, 3)
+pool.Esperar()
+
+
 # GENERACIÓN DE LA FIRMA
 
 print("\nGENERACIÓN DE LA FIRMA:\n")
@@ -61,18 +77,19 @@ print("\nGENERACIÓN DE LA FIRMA:\n")
 
 # Generamos los 3 Cloak Elements
 start_time_cloaking_elements = time.time()
-v = Cloaking_Element(Permutation(range(N)), eval, 3, N)
-v1 = Cloaking_Element(Pw[1], eval, 3, N)
-v2 = Cloaking_Element(Pw_[1], eval, 3, N)
+v = pool.Obtener(Permutacion.Identidad(N), eval, 3)
+v1 = pool.Obtener(Pw[1], eval, 3)
+v2 = pool.Obtener(Pw_[1], eval, 3)
 end_time_cloaking_elements = time.time()
 
 print("PASO 1 - GENERACIÓN DE LOS ELEMENTOS DE OCULTACIÓN:\n")
 print("\nv =", v.showBraid())
 print("v1 =", v1.showBraid())
 print("v2 =", v2.showBraid())
+print("Estadísticas de la reserva de Cloak Elements:", pool.estadisticas)
 
 print("\nComprobaciones de Cloak Elements")
-print("\nID * v =", E_Multiplicacion(eye(N), Permutation(range(N)),
+print("\nID * v =", E_Multiplicacion(eye(N), Permutacion.Identidad(N),
                                      v.elementos, N, q, t_values, eval))
 print("\nP(w) * v1 =", E_Multiplicacion(Pw[0], Pw[1], v1.elementos, N, q,
                                         t_values, eval))
@@ -99,21 +116,50 @@ Etiam vitae maximus diam."
 parser = argparse.ArgumentParser(description='Aplicar firma a contenido pasado por línea de comandos.')
 parser.add_argument('--mensaje', type=str, help='El mensaje para el algoritmo de firma digital.')
 parser.add_argument('--archivo', type=str, help='Ruta al archivo cuyo contenido se usará como mensaje.')
+parser.add_argument('--hash', type=str, choices=['sha256', 'blake2b'], default='sha256',
+                    help='Función Hash (SHA-256 o BLAKE2b truncado a 256 bits).')
+parser.add_argument('--mmap', action='store_true',
+                    help='Mapear el archivo en memoria en lugar de leerlo por bloques.')
+parser.add_argument('--crecimiento', type=float, default=None,
+                    help='Factor de crecimiento objetivo de la firma frente a la palabra sin reescribir.')
+parser.add_argument('--longitud-firma', type=int, default=None,
+                    help='Longitud objetivo de la firma (tiene prioridad sobre --crecimiento).')
+parser.add_argument('--bloque-maximo', type=int, default=10,
+                    help='Longitud máxima de los bloques de SRel(P) (mezcla mínima, también con '
+                         'objetivo de longitud).')
+parser.add_argument('--mirilla', action='store_true',
+                    help='Acortar la firma reescrita con una pasada de mirilla. Deshace buena parte '
+                         'del crecimiento de la reescritura (la firma puede quedar más corta que la '
+                         'palabra original) y no admite --crecimiento ni --longitud-firma.')
 
 args = parser.parse_args()
+if args.mirilla and (args.crecimiento is not None or args.longitud_firma is not None):
+    parser.error('--mirilla no se puede combinar con --crecimiento ni --longitud-firma')
+if args.bloque_maximo < 2:
+    parser.error('--bloque-maximo debe ser al menos 2')
 
+# El archivo no se carga en memoria: se calcula su Hash por bloques (o con mmap)
+archivo = None
 if args.archivo and os.path.isfile(args.archivo):
-    with open(args.archivo, 'rb') as file:
-        m = file.read()
+    archivo = args.archivo
 elif args.mensaje:
     m = args.mensaje.encode()
 
 
 print("\nPASO 2 - CÁLCULO DEL HASH DEL MENSAJE A FIRMAR:\n")
-print("Mensaje a firmar:", m)
+if archivo:
+    print("Archivo a firmar:", archivo, "(%d bytes)" % os.path.getsize(archivo))
+else:
+    print("Mensaje a firmar:", m)
+print("Función Hash:", args.hash)
 
+# El resumen se calcula una única vez y se reutiliza en la codificación
 start_time_hash = time.time()
-Hm, cuartetos = SHA256(m)
+if archivo:
+    digest = ResumenArchivo(archivo, args.hash, usar_mmap=args.mmap)
+else:
+    digest = ResumenMensaje(m, args.hash)
+Hm, cuartetos = BinarioResumen(digest)
 end_time_hash = time.time()
 print("\n\nSalida binaria del Hash del mensaje:", Hm)
 
@@ -123,7 +169,7 @@ print("\nPASO 3 - CODIFICACIÓN DEL HASH AL GRUPO TRENZADO ELEGIDO:\n")
 
 # Codificamos m a BN
 start_time_encoder = time.time()
-EHm, CN4 = Encoder_WalnutDSA(m, N)
+EHm = Encoder_WalnutDSA_Hash(digest, N, CN4)[0]
 end_time_encoder = time.time()
 print("Salida hash codificada a trenza del subgrupo puro generado:\n")
 print("Palabra:", EHm.elementos)
@@ -137,10 +183,19 @@ print("\nPASO 4 - CÁLCULO DE LA FIRMA:\n")
 
 # Calculamos Sig
 start_time_sig = time.time()
-palabraSig0 = ReduccionLibre(v1.elementos + w.inverseBraid().elementos + \
-                      v.elementos + EHm.elementos + w_.elementos + v2.elementos)
-
-palabraSig = StochasticRewriting(palabraSig0, ArtinGen_p, yGen_p)
+reductorSig = ReductorLibre()
+for palabra in (v1.elementos, w.inverseBraid().elementos, v.elementos,
+                EHm.elementos, w_.elementos, v2.elementos):
+  reductorSig.extend(palabra)
+palabraSig0 = reductorSig.tolist()
+
+estadisticas_reescritura = {}
+palabraSig = StochasticRewriting(palabraSig0, SistemaYGen(N, particion),
+                                 longitud_objetivo=args.longitud_firma,
+                                 factor_crecimiento=args.crecimiento,
+                                 bloque_maximo=args.bloque_maximo,
+                                 mirilla=args.mirilla,
+                                 estadisticas=estadisticas_reescritura)
 print("Como se puede ver comprobar, el algoritmo de reescritura \
 efectivamente genera una nueva palabra:")
 print("\nPalabra original representante de la firma:", palabraSig0)
@@ -159,6 +214,16 @@ execution_time_hash + execution_time_encoder + execution_time_sig
 print("\nTrenza Sig que actúa como firma:")
 print("Palabra:", Sig.elementos)
 print("Longitud palabra:", len(Sig.elementos))
+print("Factor de expansión de la reescritura: {:.2f} ({} --> {} generadores, \
+{} pasadas de SRel(P))".format(estadisticas_reescritura["factor_expansion"],
+                               estadisticas_reescritura["longitud_inicial"],
+                               estadisticas_reescritura["longitud_final"],
+                               len(estadisticas_reescritura["bloques"])))
+if estadisticas_reescritura["objetivo_cumplido"] is False:
+  print("AVISO: no se ha cumplido la longitud objetivo de la firma ({} \
+generadores): diferencia de {:+d} generadores".format(
+      estadisticas_reescritura["longitud_objetivo"],
+      estadisticas_reescritura["diferencia_objetivo"]))
 print("Permutación proyectada:", Sig.perm)
 
 # PASO 5 - FIRMA GENERADA POR WALNUTDSA
@@ -183,31 +248,20 @@ print("\n\nTiempo de Ejecución del cómputo de la firma: ",  execution_time_sig
 
 print("\nVERIFICACIÓN DE LA FIRMA:\n")
 
-# PASO 1 - CODIFICACIÓN DEL HASH AL GRUPO TRENZADO ACORDADO
-print("PASO 1 - CODIFICACIÓN DEL HASH AL GRUPO TRENZADO ACORDADO:\n")
-
-# Codificamos resumen a BN
-start_time_encoderV = time.time()
-EHm = Encoder_WalnutDSA_Hash(Hm, N, CN4)[0]
-end_time_encoderV = time.time()
-print("Salida hash codificada a trenza del subgrupo puro generado:\n")
-print("Palabra:", EHm.elementos)
-print("Longitud palabra codificada:", len(EHm.elementos))
-print("Permutación proyectada por la trenza codificada:", EHm.perm)
-
-# PASO 2 - EVALUACIÓN DE P(E(H(m)))
-print("\nPASO 2 - EVALUACIÓN DE P(E(H(m))):\n")
+# PASO 1 - EVALUACIÓN DE P(E(H(m)))
+print("PASO 1 - EVALUACIÓN DE P(E(H(m))):\n")
 
-# Evaluamos P(E(H(m)))
+# Evaluamos P(E(H(m))) directamente a partir del Hash y de las E-Imágenes
+# precalculadas de CN4, sin codificar la trenza E(H(m))
 start_time_PEHm = time.time()
-PEHm = E_Multiplicacion_P(EHm.elementos, N, q, t_values, eval)
+PEHm = E_Multiplicacion_P_Hash(Hm, CN4, N, q, eval)
 end_time_PEHm = time.time()
 print("P(E(H(m))):\nMatriz =\n ")
 pprint(PEHm[0])
 print("\n\nPermutación = ", PEHm[1])
 
-# PASO 3 - EVALUACIÓN Y CÁLCULO DE P(w) * Sig
-print("\nPASO 3 - EVALUACIÓN Y CÁLCULO DE P(w) * Sig:\n")
+# PASO 2 - EVALUACIÓN Y CÁLCULO DE P(w) * Sig
+print("\nPASO 2 - EVALUACIÓN Y CÁLCULO DE P(w) * Sig:\n")
 
 # E-Multiplicamos P(w) * Sig
 start_time_PwSig = time.time()
@@ -218,8 +272,8 @@ pprint(Pw_Sig[0])
 print("\nPermutación final:", Pw_Sig[1])
 
 
-# PASO 4 - COMPROBACIÓN DE IGUALDAD QUE VERIFICA SI Y SOLO SI LA FIRMA
-print("\nPASO 4 - COMPROBACIÓN DE IGUALDAD QUE VERIFICA SI Y SOLO SI LA FIRMA:\n")
+# PASO 3 - COMPROBACIÓN DE IGUALDAD QUE VERIFICA SI Y SOLO SI LA FIRMA
+print("\nPASO 3 - COMPROBACIÓN DE IGUALDAD QUE VERIFICA SI Y SOLO SI LA FIRMA:\n")
 
 # Calculamos el miembro derecho de la igualdad
 start_time_Comp = time.time()
@@ -240,22 +294,21 @@ print("\n¿Se verifica la identidad del firmante?", Igualdad_Verificacion)
 
 # DESGLOSE DE LOS TIEMPOS DE EJECUCIÓN
 
-execution_time_encoderV = end_time_encoderV - start_time_encoderV
 execution_time_PEHm = end_time_PEHm - start_time_PEHm
 execution_time_PwSig = end_time_PwSig - start_time_PwSig
 execution_time_Comp = end_time_Comp - start_time_Comp
-execution_time_verification = execution_time_encoderV + execution_time_PEHm + \
-execution_time_PwSig + execution_time_Comp
+execution_time_verification = execution_time_PEHm + execution_time_PwSig + \
+execution_time_Comp
 
 print("\n\nDESGLOSE DE LOS TIEMPSO DE EJECUCIÓN:\n")
 
 print("\nTiempo de Ejecución de la Verificación: ",
       execution_time_verification, "segundos")
-print("\n\nTiempo de Ejecución de la Codificación: ",
-      execution_time_encoderV, "segundos")
 print("\n\nTiempo de Ejecución de la P-Evaluación: ",
       execution_time_PEHm, "segundos")
 print("\n\nTiempo de Ejecución de la E-Multiplicación: ",
       execution_time_PwSig, "segundos")
 print("\n\nTiempo de Ejecución de la comprobación: ",
       execution_time_Comp, "segundos\n")
+
+pool.Detener()